@@ -0,0 +1,104 @@
+# Synthetic documents for python -m benchmarks.run, each generated along one
+# axis that stresses a different part of the parser. Sizes grow linearly with
+# scale, and the output doesn't vary from run to run, so that timings of
+# different versions can be compared.
+import os
+
+STATUSES = ["active", "inactive", "pending", "banned"]
+CITIES = ["Springfield", "Shelbyville", "Ogdenville", "North Haverbrook"]
+
+# nested containers per document in deep_nesting, which the json module can
+# still decode without reaching the recursion limit
+NESTING_DEPTH = 400
+
+
+def record(i):
+    return '{"id": %d, "name": "user%d", "status": "%s", "score": %d.5, "verified": %s, ' \
+           '"tags": ["t%d", "t%d"], "address": {"city": "%s", "zip": "%05d"}}' % (
+               i, i, STATUSES[i % len(STATUSES)], i % 1000, "true" if i % 3 else "false",
+               i % 7, i % 11, CITIES[i % len(CITIES)], i % 100000)
+
+
+def wide_records(scale):
+    # one flat array of small records, all plain JSON
+    return "[\n" + ",\n".join("  " + record(i) for i in range(5000 * scale)) + "\n]\n"
+
+
+def deep_nesting(scale):
+    # arrays of alternately nested arrays and objects
+    documents = []
+    for i in range(25 * scale):
+        opening = "".join('{"k%d": [' % (d % 10) for d in range(NESTING_DEPTH // 2))
+        documents.append(opening + str(i) + "]}" * (NESTING_DEPTH // 2))
+    return "[" + ", ".join(documents) + "]\n"
+
+
+def escaped_strings(scale):
+    # long strings full of escapes and characters outside ASCII
+    pieces = ['plain text ', 'tab\\t', 'quote \\"q\\" ', 'back\\\\slash ', 'line\\nbreak ', '\\u00e9t\\u00e9 ',
+              'emoji \\ud83d\\ude00 ', 'café ', '\\/']
+    strings = []
+    for i in range(2000 * scale):
+        strings.append('"' + "".join(pieces[(i + j) % len(pieces)] for j in range(24)) + '"')
+    return "[\n" + ",\n".join("  " + s for s in strings) + "\n]\n"
+
+
+def xml_heavy(scale):
+    # records carrying XHTML blurbs, as the "intro" fields of tests/test.jxon do
+    paragraphs = "".join('    <p class="para">Paragraph %d with <b>bold</b>, <i>italic</i> and &amp; text\n'
+                         '      over two lines.</p>\n' % j for j in range(8))
+    blurb = '<div class="intro">\n    <h1>Title <em>here</em></h1>\n' + paragraphs + '  <br/></div>'
+    records = ['  {"id": %d, "intro": %s}' % (i, blurb.replace("Title", "Title %d" % i)) for i in range(1000 * scale)]
+    return "[\n" + ",\n".join(records) + "\n]\n"
+
+
+def comment_heavy(scale):
+    # records interleaved with line and block comments, with multiline strings
+    records = []
+    for i in range(2000 * scale):
+        records.append('  // record %d\n  /* status: %s */\n  {"id": %d, // the key\n   "note": "first line\n'
+                       '      second line", "n": %d}' % (i, STATUSES[i % len(STATUSES)], i, i % 97))
+    return "[\n" + ",\n".join(records) + "\n]\n"
+
+
+def large_jxsd(scale):
+    # a schema of many named types, each referring to the one before
+    lines = ['Status = Enum("active", "inactive", "pending", "banned")\n',
+             'T0 = {"id": Integer, "name": String}\n']
+    count = 200 * scale
+    for i in range(1, count):
+        lines.append('T%d = {"id": Integer, "name": String, "status": Status, "score": Float, '
+                     '"children": [T%d], "extra": {"flag": Boolean, "labels": [String]}}\n' % (i, i - 1))
+    lines.append("\n[T%d]\n" % (count - 1))
+    return "".join(lines)
+
+
+def import_graph(directory, scale):
+    # Writes a chain of modules, each importing the next, along with a module
+    # of shared values that all of them import, and returns the path of the
+    # first. Every module adds a few records of its own to what it imports.
+    depth = 20 * scale
+    with open(os.path.join(directory, "common.jxon"), "w") as fh:
+        fh.write('statuses = %s\n\nexport statuses;\n' % str(STATUSES).replace("'", '"'))
+
+    for level in range(depth):
+        lines = ['import {statuses} from "./common.jxon";\n']
+        if level + 1 < depth:
+            lines.append('import child from "./module%d.jxon";\n' % (level + 1))
+        lines.append('\n{"level": %d, "statuses": statuses, "records": [\n' % level)
+        lines.append(",\n".join("  " + record(level * 10 + i) for i in range(10)))
+        lines.append('\n], "child": %s}\n' % ("child" if level + 1 < depth else "null"))
+        with open(os.path.join(directory, "module%d.jxon" % level), "w") as fh:
+            fh.write("".join(lines))
+
+    return os.path.join(directory, "module0.jxon")
+
+
+# the corpora of single documents, by name, and whether each is plain JSON
+CORPORA = {
+    "wide_records": (wide_records, True),
+    "deep_nesting": (deep_nesting, True),
+    "escaped_strings": (escaped_strings, True),
+    "xml_heavy": (xml_heavy, False),
+    "comment_heavy": (comment_heavy, False),
+}
@@ -0,0 +1,73 @@
+# Reports the resident memory of a million-record document loaded with and
+# without interning. Each load runs in a fresh process, so that the figures
+# don't include memory left over from the others. Run from the repository root
+# with python -m benchmarks.intern
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import jxon
+from jxon.interning import Interner
+
+RECORDS = 10 ** 6
+STATUSES = ["active", "inactive", "pending", "banned"]
+
+# the intern argument for each mode, made in the process doing the load
+MODES = {
+    "no interning": lambda: None,
+    "intern=True": lambda: True,
+    "short values": lambda: Interner(max_string_length=16),
+}
+
+
+def write_document(fh, comment):
+    # A comment inside the array keeps the JSON fast path from taking the whole
+    # array in one go, as happens with any JXON-only syntax between records
+    fh.write("[\n")
+    if comment:
+        fh.write("  // generated\n")
+    for i in range(RECORDS):
+        fh.write('  {"id": %d, "name": "user%d", "status": "%s", "address": {"city": "%s", "zip": "%05d"}}%s\n' % (
+            i, i, STATUSES[i % len(STATUSES)], ["Springfield", "Shelbyville"][i % 2], i % 100000,
+            "," if i < RECORDS - 1 else ""))
+    fh.write("]\n")
+
+
+def resident_mb():
+    # the current resident set size where /proc is available, and otherwise the peak
+    try:
+        with open("/proc/self/statm", "r") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def measure(path, mode):
+    baseline = resident_mb()
+    with open(path, "r") as fh:
+        obj = jxon.load(fh, intern=MODES[mode]())
+    print("%.0f" % (resident_mb() - baseline))
+    return obj
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for comment in [False, True]:
+            path = os.path.join(directory, "records.jxon")
+            with open(path, "w") as fh:
+                write_document(fh, comment)
+
+            print("with a comment between records:" if comment else "plain JSON:")
+            for name in MODES:
+                out = subprocess.run([sys.executable, "-m", "benchmarks.intern", path, name],
+                                     capture_output=True, text=True, check=True).stdout
+                print(f"  {name:14} {out.strip():>6} MB resident")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        measure(sys.argv[1], sys.argv[2])
+    else:
+        main()
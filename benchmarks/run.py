@@ -0,0 +1,192 @@
+# Times loading, encoding, comparing and typing the synthetic documents of
+# benchmarks.corpora, next to the json module wherever it can read the same
+# document, along with parsing a large JXSD schema and loading a deep chain of
+# imports. Run from the repository root with
+#
+#   python -m benchmarks.run [--scale N] [--only TEXT] [--save FILE] [--compare FILE] [--threshold T]
+#
+# --save writes the timings to FILE as a JSON baseline. --compare reports every
+# benchmark that has become slower than its timing in FILE by more than the
+# threshold (0.2 by default, for 20%), and exits with status 1 if any has.
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+
+import jxon
+from jxon import jxsd
+from jxon.cache import module_cache, disk_cache
+from jxon.jxontype import parse_type
+
+from . import corpora
+
+REPEAT = 5
+BASELINE_FORMAT = 1
+
+
+def best_time(func, setup=None):
+    # The fastest of several runs, being the one least disturbed by whatever else
+    # the machine was doing. Quick functions are run enough times in a row for
+    # each run to take a fifth of a second. setup is run before every call,
+    # untimed.
+    if setup is None:
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        return min(timer.repeat(repeat=REPEAT, number=number)) / number
+
+    times = []
+    for _ in range(REPEAT):
+        setup()
+        times.append(timeit.timeit(func, number=1))
+    return min(times)
+
+
+def document_benchmarks(name, s, is_json, directory):
+    # (benchmark name, function, setup) for each operation on one document, with
+    # the json module's counterpart named after it in brackets
+    path = os.path.join(directory, name + (".json" if is_json else ".jxon"))
+    with open(path, "w") as fh:
+        fh.write(s)
+
+    def load():
+        with open(path, "r") as fh:
+            return jxon.load(fh)
+
+    obj = jxon.loads(s)
+    copy = jxon.loads(s)
+    schema = parse_type(obj)
+
+    yield name + ".loads", lambda: jxon.loads(s), None
+    yield name + ".load", load, None
+    yield name + ".dumps", lambda: jxon.dumps(obj), None
+    yield name + ".jxon_equal", lambda: jxon.jxon_equal(obj, copy), None
+    yield name + ".parse_type", lambda: parse_type(obj), None
+    yield name + ".is_jxon_instance", lambda: schema.is_jxon_instance(obj), None
+
+    if is_json:
+        json_obj = json.loads(s)
+        json_copy = json.loads(s)
+        yield name + ".loads[json]", lambda: json.loads(s), None
+        yield name + ".dumps[json]", lambda: json.dumps(json_obj, ensure_ascii=False), None
+        yield name + ".jxon_equal[json ==]", lambda: json_obj == json_copy, None
+
+
+def schema_benchmarks(scale):
+    s = corpora.large_jxsd(scale)
+    schema = jxsd.loads(s)
+    yield "large_jxsd.jxsd.loads", lambda: jxsd.loads(s), None
+    yield "large_jxsd.jxsd.dumps", lambda: jxsd.dumps(schema), None
+
+
+def import_benchmarks(directory, scale):
+    # Loading the first module of the chain, once with every module parsed from
+    # scratch and once with all of them already in the module cache
+    path = corpora.import_graph(directory, scale)
+
+    def load():
+        with open(path, "r") as fh:
+            return jxon.load(fh)
+
+    yield "import_graph.load", load, module_cache.clear
+    yield "import_graph.load_cached", load, load
+
+
+def all_benchmarks(directory, scale):
+    for name, (generate, is_json) in corpora.CORPORA.items():
+        yield from document_benchmarks(name, generate(scale), is_json, directory)
+    yield from schema_benchmarks(scale)
+    yield from import_benchmarks(directory, scale)
+
+
+def run(scale, only=None):
+    # the best time of every benchmark whose name contains only, in seconds
+    results = {}
+    # files are parsed afresh, whatever JXON_CACHE_DIR says
+    directory = disk_cache.directory
+    disk_cache.directory = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, func, setup in all_benchmarks(tmp, scale):
+                if only is not None and only not in name:
+                    continue
+                results[name] = best_time(func, setup)
+                print(format_result(name, results), flush=True)
+    finally:
+        disk_cache.directory = directory
+    return results
+
+
+def format_result(name, results):
+    line = f"{name:40} {results[name] * 1e3:10.2f} ms"
+    counterpart = results.get(name.split("[")[0])
+    if "[json" in name and counterpart is not None:
+        line += f"   jxon takes {counterpart / results[name]:.1f}x as long"
+    return line
+
+
+def save_baseline(path, scale, results):
+    baseline = {
+        "format": BASELINE_FORMAT,
+        "scale": scale,
+        "jxon": jxon.__version__,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w") as fh:
+        json.dump(baseline, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def compare(path, scale, results, threshold):
+    # Returns the names of the benchmarks that are slower than in the baseline at
+    # path by more than threshold, printing how each benchmark has changed
+    with open(path, "r") as fh:
+        baseline = json.load(fh)
+
+    if baseline.get("format") != BASELINE_FORMAT or baseline.get("scale") != scale:
+        print(f"{path} was not made with --scale {scale} by this version of the runner")
+        return []
+
+    regressions = []
+    print(f"\nCompared with {path} ({baseline['machine']}, Python {baseline['python']}):")
+    for name, seconds in results.items():
+        before = baseline["results"].get(name)
+        if before is None or "[json" in name:
+            continue
+        change = seconds / before - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "   REGRESSION"
+        print(f"{name:40} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--scale", type=int, default=1, help="multiplies the size of every corpus")
+    parser.add_argument("--only", help="runs only the benchmarks whose names contain this")
+    parser.add_argument("--save", metavar="FILE", help="saves the timings to FILE as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="flags benchmarks slower than in the baseline FILE")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="the slowdown beyond which a benchmark is flagged (default 0.2)")
+    args = parser.parse_args(argv)
+
+    results = run(args.scale, args.only)
+    if args.save is not None:
+        save_baseline(args.save, args.scale, results)
+
+    if args.compare is not None:
+        regressions = compare(args.compare, args.scale, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) more than {args.threshold:.0%} slower than the baseline")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
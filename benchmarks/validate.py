@@ -0,0 +1,30 @@
+# Compares JXONType.is_jxon_instance against validators from JXONType.compile()
+# on records shaped like tests/data.json. Run from the repository root with
+# python -m benchmarks.validate
+import copy
+import json
+import timeit
+
+from jxon.jxontype import parse_type
+
+RECORDS = 1000
+REPEAT = 5
+
+
+def main():
+    with open("tests/data.json", "r") as fh:
+        record = json.load(fh)
+
+    records = [copy.deepcopy(record) for _ in range(RECORDS)]
+    schema = parse_type(record)
+    validate = schema.compile()
+
+    interpreted = min(timeit.repeat(lambda: [schema.is_jxon_instance(r) for r in records], number=1, repeat=REPEAT))
+    compiled = min(timeit.repeat(lambda: [validate(r) for r in records], number=1, repeat=REPEAT))
+
+    print(f"is_jxon_instance: {interpreted * 1e6 / RECORDS:8.1f} us/record")
+    print(f"compile():        {compiled * 1e6 / RECORDS:8.1f} us/record ({interpreted / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,15 @@
-from . import jxsd
+from . import jxsd, binary
+from .cache import ModuleCache, module_cache, DiskCache, disk_cache
 from .combined import CombinedParser as JXONParser
-from .combined import load, loads, dump, dumps, jxon_equal
+from .combined import load, loads, dump, dumps, iterencode, jxon_equal, iterparse, iter_items
+from .combined import aload, aloads, adump, load_columnar, open_indexed
+from .aio import AsyncLoader, FileLoader
+from .records import JXONRecord
+from .columnar import Column
+from .indexed import IndexedDocument
+from .lazy import LazyList, LazyDict, LazyElement
+from .fingerprint import fingerprint, FingerprintCache
+from .stats import ParseStats
+from .xmlbackends import XMLBackend, CompactElement
 
 __version__ = "1.0.1"
@@ -0,0 +1,124 @@
+import asyncio
+import functools
+import os
+
+from .cache import ModuleCache
+from .jxon import JXONParseException
+from .parser import IMPORTING, load_source, loads_factory
+
+
+class AsyncLoader:
+    """
+    Where aload reads files from. Subclasses implement read, returning the
+    contents of the file at an absolute path as a string, and raising OSError if
+    there is no such file.
+    """
+
+    async def read(self, filepath):
+        raise NotImplementedError
+
+
+class FileLoader(AsyncLoader):
+    async def read(self, filepath):
+        return await run_in_executor(read_file, filepath)
+
+
+def read_file(filepath):
+    with open(filepath, 'r') as fh:
+        return fh.read()
+
+
+def write_file(filepath, dump, obj, kwargs):
+    with open(filepath, 'w') as fh:
+        dump(obj, fh, **kwargs)
+
+
+async def run_in_executor(f, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, f, *args)
+
+
+class SourceCache(ModuleCache):
+    # A module cache for a single aload call, which parses files from sources
+    # that have already been fetched through its loader
+
+    def __init__(self, sources):
+        super().__init__(maxsize=len(sources) + 128)
+        self.sources = sources
+
+    def read_source(self, filepath):
+        if filepath in self.sources:
+            return self.sources[filepath]
+        raise JXONParseException("Not fetched through the loader: " + filepath)
+
+    def fresh_entry(self, key):
+        # sources cannot change for the duration of the load
+        with self.lock:
+            return self.entries.get(key)
+
+
+async def fetch_sources(filepath, s, parser_class, loader):
+    # Fetches every file reachable through import sections or inline imports,
+    # fetching the files imported by each file concurrently. Files that cannot be
+    # fetched or scanned are skipped, leaving it to the parse to report the error.
+    sources = {}
+    seen = {filepath}
+
+    async def fetch(filepath, s, parser_class):
+        if s is None:
+            try:
+                s = await loader.read(filepath)
+            except OSError:
+                return
+        sources[filepath] = s
+
+        try:
+            parser = parser_class(s, os.path.dirname(filepath))
+            imports = parser.scan_imports() + parser.scan_inline_imports()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except BaseException:
+            return
+
+        imports = [(path, cls) for path, cls in imports if path not in seen]
+        seen.update(path for path, _ in imports)
+        await asyncio.gather(*(fetch(path, None, cls) for path, cls in imports))
+
+    await fetch(filepath, s, parser_class)
+    return sources
+
+
+def parse_sources(filepath, sources, parser_class, kwargs):
+    IMPORTING.cache = SourceCache(sources)
+    try:
+        return load_source(sources[filepath], filepath, parser_class, **kwargs)
+    finally:
+        IMPORTING.cache = None
+
+
+def aload_factory(parser_class):
+    async def aload(filepath, loader=None, **kwargs):
+        if loader is None:
+            loader = FileLoader()
+
+        filepath = os.path.abspath(filepath)
+        s = await loader.read(filepath)
+        sources = await fetch_sources(filepath, s, parser_class, loader)
+        return await run_in_executor(parse_sources, filepath, sources, parser_class, kwargs)
+
+    return aload
+
+
+def aloads_factory(parser_class):
+    loads = loads_factory(parser_class)
+
+    async def aloads(s, **kwargs):
+        return await run_in_executor(functools.partial(loads, s, **kwargs))
+
+    return aloads
+
+
+def adump_factory(dump):
+    async def adump(obj, filepath, **kwargs):
+        await run_in_executor(write_file, filepath, dump, obj, kwargs)
+
+    return adump
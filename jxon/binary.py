@@ -0,0 +1,427 @@
+# A compact binary encoding of JXON. Since every element of an array shares one
+# type, the type of the whole object, as given by parse_type or a schema, is
+# written once at the start, and values are then written positionally without
+# keys or delimiters:
+#
+# * integers as zigzag varints, floats as 8-byte doubles, booleans as one byte
+# * strings as a varint length followed by UTF-8
+# * arrays as a varint length followed by their elements
+# * objects as their member values, in the order of the keys in the type
+# * Enum values as varint indices into the sorted members of the Enum
+# * XML elements as their tag, attributes, text, tail and child elements
+#
+# Every value may be null, which is folded into the varint or flag byte that
+# starts it. Where the type is null (unknown), the value is preceded by a type of
+# its own. Neither encoding nor decoding recurses, so deeply nested objects are
+# no problem.
+
+import struct
+from xml.etree import ElementTree as ET
+
+from .jxontype import JXONType, parse_type
+from .records import JXONRecord
+from .xmlbackends import element_backend, make_xml_backend
+
+MAGIC = b"JXB\x01"
+
+# type tags in the header
+NULL_TYPE = 0
+INT_TYPE = 1
+FLOAT_TYPE = 2
+BOOL_TYPE = 3
+STR_TYPE = 4
+XML_TYPE = 5
+LIST_TYPE = 6
+DICT_TYPE = 7
+ENUM_TYPE = 8
+
+SIMPLE_TYPE_TAGS = {
+    int: INT_TYPE,
+    float: FLOAT_TYPE,
+    bool: BOOL_TYPE,
+    str: STR_TYPE,
+    ET.Element: XML_TYPE,
+}
+TAG_SIMPLE_TYPES = {tag: jxon_type for jxon_type, tag in SIMPLE_TYPE_TAGS.items()}
+
+DOUBLE = struct.Struct("<d")
+
+
+class JXONBinaryException(BaseException):
+    pass
+
+
+def enum_members(jxon_type):
+    return sorted(jxon_type.subtype)
+
+
+class Writer:
+    def __init__(self):
+        self.out = bytearray()
+
+    def varint(self, n):
+        out = self.out
+        while n > 0x7f:
+            out.append((n & 0x7f) | 0x80)
+            n >>= 7
+        out.append(n)
+
+    def nullable_varint(self, n):
+        # 0 stands for null, so everything else is shifted up by one
+        self.varint(0 if n is None else n + 1)
+
+    def string(self, s):
+        if s is None:
+            self.varint(0)
+            return
+        b = s.encode('utf-8', 'surrogatepass')
+        self.varint(len(b) + 1)
+        self.out += b
+
+    def write_type(self, jxon_type):
+        stack = [jxon_type]
+        while stack:
+            t = stack.pop()
+            if t is None:
+                self.varint(NULL_TYPE)
+            elif t.jxon_type in SIMPLE_TYPE_TAGS:
+                self.varint(SIMPLE_TYPE_TAGS[t.jxon_type])
+            elif t.jxon_type is list:
+                self.varint(LIST_TYPE)
+                stack.append(t.subtype)
+            elif t.jxon_type is dict:
+                self.varint(DICT_TYPE)
+                self.varint(len(t.subtype))
+                for key in t.subtype:
+                    self.string(key)
+                stack.extend(reversed(list(t.subtype.values())))
+            else:
+                members = enum_members(t)
+                self.varint(ENUM_TYPE)
+                self.varint(SIMPLE_TYPE_TAGS[type(members[0])])
+                self.varint(len(members))
+                for member in members:
+                    self.write_value(JXONType(type(member)), member)
+
+    def write_value(self, jxon_type, value):
+        out = self.out
+        stack = [(jxon_type, value)]
+        enum_indices = {}
+        while stack:
+            t, v = stack.pop()
+
+            if t is None:
+                # the type is unknown, so the value carries its own
+                t = parse_type(v)
+                self.write_type(t)
+                if t is None:
+                    continue
+
+            kind = t.jxon_type
+            if v is not None and kind is not set and type(v) is not kind \
+                    and not (kind is dict and isinstance(v, JXONRecord)) \
+                    and not (kind is ET.Element and element_backend(v) is not None):
+                raise JXONBinaryException("Expected " + kind.__name__ + ", got " + repr(type(v)))
+
+            if kind is int:
+                self.nullable_varint(None if v is None else (v << 1 if v >= 0 else ((-v) << 1) - 1))
+
+            elif kind is str:
+                self.string(v)
+
+            elif kind is float:
+                if v is None:
+                    out.append(0)
+                else:
+                    out.append(1)
+                    out += DOUBLE.pack(v)
+
+            elif kind is bool:
+                out.append(0 if v is None else 2 if v else 1)
+
+            elif kind is list:
+                if v is None:
+                    self.varint(0)
+                    continue
+                self.varint(len(v) + 1)
+                subtype = t.subtype
+                stack.extend((subtype, e) for e in reversed(v))
+
+            elif kind is dict:
+                if v is None:
+                    out.append(0)
+                    continue
+                out.append(1)
+                if len(v) != len(t.subtype) or any(key not in v for key in t.subtype):
+                    raise JXONBinaryException("Object keys do not match type: " + repr(list(v.keys())))
+                stack.extend((member_type, v[key]) for key, member_type in reversed(list(t.subtype.items())))
+
+            elif kind is set:
+                indices = enum_indices.get(id(t))
+                if indices is None:
+                    indices = enum_indices[id(t)] = {member: i for i, member in enumerate(enum_members(t))}
+                if v is not None and v not in indices:
+                    raise JXONBinaryException("Not a member of Enum: " + repr(v))
+                self.nullable_varint(None if v is None else indices[v])
+
+            else:
+                if v is None:
+                    self.varint(0)
+                else:
+                    self.varint(1)
+                    self.write_xml(v)
+
+    def write_xml(self, element):
+        stack = [element]
+        while stack:
+            e = stack.pop()
+            backend = element_backend(e)
+            self.string(backend.tag(e))
+            attributes = backend.items(e)
+            self.varint(len(attributes))
+            for key, value in attributes:
+                self.string(key)
+                self.string(value)
+            self.string(e.text)
+            self.string(e.tail)
+            children = list(backend.children(e))
+            self.varint(len(children))
+            stack.extend(reversed(children))
+
+
+class Reader:
+    def __init__(self, data, xml_backend):
+        self.data = data
+        self.pos = 0
+        self.xml_backend = xml_backend
+
+    def varint(self):
+        data = self.data
+        pos = self.pos
+        b = data[pos]
+        pos += 1
+        n = b & 0x7f
+        shift = 7
+        while b & 0x80:
+            b = data[pos]
+            pos += 1
+            n |= (b & 0x7f) << shift
+            shift += 7
+        self.pos = pos
+        return n
+
+    def string(self):
+        n = self.varint()
+        if n == 0:
+            return None
+        start = self.pos
+        self.pos = start + n - 1
+        if self.pos > len(self.data):
+            raise IndexError("string runs past the end of the data")
+        return self.data[start:self.pos].decode('utf-8', 'surrogatepass')
+
+    def byte(self):
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    def read_type(self):
+        # each frame is [container type, keys, member types read so far]
+        root = JXONType(list)
+        stack = [[root, None, []]]
+        while True:
+            tag = self.varint()
+            if tag == LIST_TYPE:
+                t = JXONType(list)
+                stack.append([t, None, []])
+                continue
+            elif tag == DICT_TYPE:
+                keys = [self.string() for _ in range(self.varint())]
+                t = JXONType(dict, {})
+                if keys:
+                    stack.append([t, keys, []])
+                    continue
+            elif tag == ENUM_TYPE:
+                member_type = JXONType(TAG_SIMPLE_TYPES[self.varint()])
+                t = JXONType(set, {self.read_value(member_type) for _ in range(self.varint())})
+            elif tag == NULL_TYPE:
+                t = None
+            else:
+                t = JXONType(TAG_SIMPLE_TYPES[tag])
+
+            # t is complete, so it goes into the innermost unfinished container type
+            while True:
+                container, keys, members = stack[-1]
+                members.append(t)
+                if keys is not None and len(members) < len(keys):
+                    break
+
+                if keys is None:
+                    container.subtype = t
+                else:
+                    container.subtype = dict(zip(keys, members))
+                stack.pop()
+                if not stack:
+                    return root.subtype
+                t = container
+
+    def read_value(self, jxon_type):
+        # Works like Parser.grab_element: each frame is [container, element or
+        # object type, number of elements or keys]
+        stack = []
+        # the sorted members of each Enum type met, by id
+        enum_lists = {}
+        t = jxon_type
+        while True:
+            if t is None:
+                t = self.read_type()
+                if t is None:
+                    value = None
+                    t = False
+
+            if t is False:
+                pass
+
+            else:
+                kind = t.jxon_type
+                if kind is int:
+                    n = self.varint()
+                    value = None if n == 0 else (n - 1) >> 1 if n & 1 else -(n >> 1)
+
+                elif kind is str:
+                    value = self.string()
+
+                elif kind is float:
+                    if self.byte():
+                        value = DOUBLE.unpack_from(self.data, self.pos)[0]
+                        self.pos += 8
+                    else:
+                        value = None
+
+                elif kind is bool:
+                    b = self.byte()
+                    value = None if b == 0 else b == 2
+
+                elif kind is list:
+                    n = self.varint()
+                    if n == 0:
+                        value = None
+                    elif n == 1:
+                        value = []
+                    else:
+                        stack.append([[], t.subtype, n - 1])
+                        t = t.subtype
+                        continue
+
+                elif kind is dict:
+                    if not self.byte():
+                        value = None
+                    elif not t.subtype:
+                        value = {}
+                    else:
+                        keys = list(t.subtype)
+                        stack.append([{}, t, keys])
+                        t = t.subtype[keys[0]]
+                        continue
+
+                elif kind is set:
+                    n = self.varint()
+                    if n == 0:
+                        value = None
+                    else:
+                        entry = enum_lists.get(id(t))
+                        if entry is None:
+                            # the type is kept along with its members, so that its id isn't reused
+                            entry = enum_lists[id(t)] = (t, enum_members(t))
+                        value = entry[1][n - 1]
+
+                else:
+                    value = self.read_xml() if self.varint() else None
+
+            while stack:
+                frame = stack[-1]
+                container = frame[0]
+                if type(container) is list:
+                    container.append(value)
+                    if len(container) < frame[2]:
+                        t = frame[1]
+                        break
+                else:
+                    keys = frame[2]
+                    container[keys[len(container)]] = value
+                    if len(container) < len(keys):
+                        t = frame[1].subtype[keys[len(container)]]
+                        break
+
+                stack.pop()
+                value = container
+
+            else:
+                return value
+
+    def read_xml(self):
+        backend = self.xml_backend
+        root = None
+        # each frame is [element, number of children still to read]
+        stack = []
+        while True:
+            tag = self.string()
+            attributes = {}
+            for _ in range(self.varint()):
+                key = self.string()
+                attributes[key] = self.string()
+
+            if stack:
+                e = backend.sub_element(stack[-1][0], tag, attributes)
+                stack[-1][1] -= 1
+            else:
+                e = root = backend.element(tag, attributes)
+            e.text = self.string()
+            e.tail = self.string()
+
+            children = self.varint()
+            if children:
+                stack.append([e, children])
+            else:
+                backend.close(e)
+            while stack and stack[-1][1] == 0:
+                backend.close(stack.pop()[0])
+            if not stack:
+                return root
+
+
+def dumps(obj, jxon_type=None):
+    # Encodes obj as bytes, using jxon_type as its type if given (null members of
+    # which are encoded with a type of their own), and otherwise parse_type(obj)
+    if jxon_type is None:
+        jxon_type = parse_type(obj)
+
+    writer = Writer()
+    writer.out += MAGIC
+    writer.write_type(jxon_type)
+    writer.write_value(jxon_type, obj)
+    return bytes(writer.out)
+
+
+def loads(data, xml=None):
+    if data[:len(MAGIC)] != MAGIC:
+        raise JXONBinaryException("Not binary JXON")
+
+    reader = Reader(data, make_xml_backend(xml))
+    reader.pos = len(MAGIC)
+    try:
+        value = reader.read_value(reader.read_type())
+    except (IndexError, KeyError, struct.error, UnicodeDecodeError):
+        raise JXONBinaryException("Truncated or corrupt binary JXON") from None
+
+    if reader.pos != len(data):
+        raise JXONBinaryException("Unexpected data after binary JXON")
+    return value
+
+
+def dump(obj, fp, jxon_type=None):
+    fp.write(dumps(obj, jxon_type))
+
+
+def load(fp, xml=None):
+    return loads(fp.read(), xml)
@@ -0,0 +1,212 @@
+import copy
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+# bumped whenever the pickled layout of parsed modules changes
+CACHE_FORMAT = 1
+
+
+def content_digest(s):
+    return hashlib.sha256(s.encode('utf-8')).hexdigest()
+
+
+def file_digest(filepath):
+    with open(filepath, 'r') as fh:
+        return content_digest(fh.read())
+
+
+def file_version(filepath):
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_versions(filepaths):
+    return {filepath: file_version(filepath) for filepath in filepaths}
+
+
+class ModuleCache:
+    """
+    An in-process cache of parsed modules, shared by all parsers, so that a file
+    imported several times (including across separate load/loads calls) is only
+    read and parsed once for as long as it is unchanged on disk.
+
+    Entries are keyed by absolute path and parser class, and are reparsed when
+    the modification time or size of the file, or of any file it imports,
+    changes. At most maxsize modules are kept, evicting the least recently used.
+    Unless copy is False, every lookup hands out a deep copy of the cached
+    module, so that callers cannot affect each other by mutating imported values.
+    """
+
+    def __init__(self, maxsize=128, copy=True):
+        self.maxsize = maxsize
+        self.copy = copy
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def load(self, filepath, parser_class):
+        _, module = self.load_entry(filepath, parser_class)
+        return self.hand_out(module)
+
+    def load_entry(self, filepath, parser_class):
+        filepath = os.path.abspath(filepath)
+        key = (filepath, parser_class)
+
+        entry = self.fresh_entry(key)
+        if entry is not None:
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                self.hits += 1
+            return entry
+
+        version = file_version(filepath)
+        s = self.read_source(filepath)
+        module = disk_cache.parse(s, filepath, parser_class)
+        # the module is stale as soon as the file or any of its transitive imports changes
+        versions = {filepath: version}
+        versions.update(file_versions(module.dependencies))
+
+        entry = (versions, module)
+        with self.lock:
+            self.misses += 1
+        self.store(key, entry)
+
+        return entry
+
+    def read_source(self, filepath):
+        with open(filepath, 'r') as fh:
+            return fh.read()
+
+    def fresh_entry(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry[0] == file_versions(entry[0]):
+            return entry
+        return None
+
+    def store(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def hand_out(self, module):
+        return copy.deepcopy(module) if self.copy else module
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class DiskCache:
+    """
+    A persistent cache of parsed modules, in the manner of __pycache__, so that
+    a process does not have to reparse files that an earlier process has already
+    parsed. It is disabled while directory is None.
+
+    There is one entry per source file and parser class, holding the pickled
+    module along with the hash of the source it was parsed from. An entry is
+    only used if that hash, and the hashes recorded for all of the module's
+    transitive imports, still match the files on disk. In readonly mode, stale
+    or missing entries are not written back. Entries are pickles, so the cache
+    directory must be no less trusted than the source files themselves.
+    """
+
+    def __init__(self, directory=None, readonly=False):
+        self.directory = directory
+        self.readonly = readonly
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, s, filepath, parser_class):
+        filepath = os.path.abspath(filepath)
+        digest = content_digest(s)
+
+        if self.directory is not None:
+            entry_path = self.entry_path(filepath, parser_class)
+            module = self.read(entry_path, digest)
+            if module is not None:
+                self.hits += 1
+                return module
+            self.misses += 1
+
+        module = parser_class(s, os.path.dirname(filepath)).parse_as_module()
+        module.path = filepath
+        module.digest = digest
+
+        if self.directory is not None and not self.readonly:
+            self.write(entry_path, digest, module)
+
+        return module
+
+    def entry_path(self, filepath, parser_class):
+        name = "\0".join([filepath, parser_class.__module__, parser_class.__qualname__])
+        return os.path.join(self.directory, hashlib.sha256(name.encode('utf-8')).hexdigest() + ".pickle")
+
+    def read(self, entry_path, digest):
+        try:
+            with open(entry_path, 'rb') as fh:
+                cache_format, entry_digest, module = pickle.load(fh)
+        except Exception:
+            # a missing, unreadable or corrupt entry is simply a miss
+            return None
+
+        if cache_format != CACHE_FORMAT or entry_digest != digest:
+            return None
+
+        for dependency, dependency_digest in module.dependencies.items():
+            try:
+                if file_digest(dependency) != dependency_digest:
+                    return None
+            except OSError:
+                return None
+
+        return module
+
+    def write(self, entry_path, digest, module):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # write to a temporary file first, so that concurrent readers never see
+            # a partially written entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as fh:
+                    pickle.dump((CACHE_FORMAT, digest, module), fh, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, entry_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except (OSError, pickle.PicklingError):
+            # the cache is an optimization; failing to write it is not an error
+            pass
+
+    def clear(self):
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".pickle"):
+                os.remove(os.path.join(self.directory, name))
+        self.hits = 0
+        self.misses = 0
+
+
+module_cache = ModuleCache()
+disk_cache = DiskCache(
+    directory=os.environ.get("JXON_CACHE_DIR") or None,
+    readonly=bool(os.environ.get("JXON_CACHE_READONLY")),
+)
@@ -0,0 +1,131 @@
+from array import array
+
+from .jxontype import JXONSchemaValidityException, parse_type
+from .parser import CHUNK_SIZE, iter_items_factory
+
+# typecodes of the arrays that fields of these types are stored in; fields of any
+# other type are stored in lists
+ARRAY_TYPECODES = {
+    int: 'q',
+    float: 'd',
+    bool: 'B',
+}
+
+NUMPY_DTYPES = {
+    'q': 'int64',
+    'd': 'float64',
+    'B': 'bool',
+}
+
+
+class Column:
+    """
+    The values of one field across an array of objects. values is an array.array
+    for Integer, Float and Boolean fields (or a NumPy array, if asked for), and a
+    list otherwise. valid holds 1 for every object whose value is not null and 0
+    for every object whose value is null, whose place in values holds 0, 0.0,
+    False or None.
+    """
+
+    def __init__(self, jxon_type, values, valid):
+        self.jxon_type = jxon_type
+        self.values = values
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.valid)
+
+    def __getitem__(self, i):
+        if not self.valid[i]:
+            return None
+        return bool(self.values[i]) if self.jxon_type.jxon_type is bool else self.values[i]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.valid)))
+
+    def null_count(self):
+        return len(self.valid) - sum(self.valid)
+
+
+class ColumnBuilder:
+    def __init__(self, jxon_type=None):
+        self.jxon_type = None
+        self.values = None
+        self.valid = array('B')
+        if jxon_type is not None:
+            self.set_type(jxon_type)
+
+    def set_type(self, jxon_type):
+        # called once the type is known, from the schema or the first non-null value
+        self.jxon_type = jxon_type
+        typecode = ARRAY_TYPECODES.get(jxon_type.jxon_type)
+        if typecode is None:
+            self.values = [None] * len(self.valid)
+        else:
+            self.values = array(typecode, bytes(len(self.valid) * array(typecode).itemsize))
+
+    def append(self, value):
+        if value is None:
+            self.valid.append(0)
+            if self.values is not None:
+                self.values.append(0 if type(self.values) is array else None)
+            return
+
+        if self.values is None:
+            self.set_type(parse_type(value))
+        elif type(self.values) is array and type(value) is not self.jxon_type.jxon_type:
+            # the stream only reports inconsistent items after yielding them
+            raise JXONSchemaValidityException("Inconsistent list element type")
+
+        self.valid.append(1)
+        try:
+            self.values.append(value)
+        except OverflowError:
+            # an integer too large for 64 bits, so the column falls back to a list
+            self.values = self.values.tolist()
+            self.values.append(value)
+
+    def build(self, numpy):
+        values = self.values if self.values is not None else [None] * len(self.valid)
+        if numpy and type(values) is array:
+            import numpy as np
+            values = np.frombuffer(values, dtype=NUMPY_DTYPES[values.typecode])
+        return Column(self.jxon_type, values, self.valid)
+
+
+def load_columnar_factory(parser_class):
+    iter_items = iter_items_factory(parser_class)
+
+    def load_columnar(fp, path="", schema=None, numpy=False, chunk_size=CHUNK_SIZE, intern=None, xml=None):
+        # Streams the array of objects at path (dot-separated keys, with "item"
+        # standing for any array index) into a dict of Columns, one per key. If
+        # schema, the type of the objects, is given, it picks the column types and
+        # every object is checked against it; otherwise they are inferred.
+        if type(path) is str:
+            path = tuple(path.split(".")) if path else ()
+
+        builders = None
+        validate = None
+        if schema is not None:
+            if schema.jxon_type is not dict:
+                raise JXONSchemaValidityException("Columnar schema must be an object type")
+            builders = {key: ColumnBuilder(member_type) for key, member_type in schema.subtype.items()}
+            validate = schema.compile()
+
+        for i, item in enumerate(iter_items(fp, path, chunk_size=chunk_size, intern=intern, xml=xml)):
+            if type(item) is not dict:
+                raise JXONSchemaValidityException("Expected an array of objects, found " + repr(type(item)))
+            if validate is not None and not validate(item):
+                raise JXONSchemaValidityException("Object " + str(i) + " does not match schema")
+
+            if builders is None:
+                builders = {key: ColumnBuilder() for key in item}
+            elif item.keys() != builders.keys():
+                raise JXONSchemaValidityException("Object " + str(i) + " has keys " + repr(sorted(item)) +
+                                                  ", not the columns " + repr(sorted(builders)))
+            for key, builder in builders.items():
+                builder.append(item[key])
+
+        return {key: builder.build(numpy) for key, builder in (builders or {}).items()}
+
+    return load_columnar
@@ -1,6 +1,9 @@
-from .parser import load_factory, loads_factory
-from .jxon import JXONParser, dumps, dump, jxon_equal
+from .parser import load_factory, loads_factory, iterparse_factory, iter_items_factory
+from .jxon import JXONParser, dumps, dump, iterencode, jxon_equal
 from .jxsd import JXSDParser
+from .aio import aload_factory, aloads_factory, adump_factory
+from .columnar import load_columnar_factory
+from .indexed import open_indexed_factory
 
 
 class CombinedParser(JXONParser):
@@ -15,3 +18,10 @@ class CombinedParser(JXONParser):
 
 loads = loads_factory(CombinedParser)
 load = load_factory(CombinedParser)
+iterparse = iterparse_factory(CombinedParser)
+iter_items = iter_items_factory(CombinedParser)
+aload = aload_factory(CombinedParser)
+aloads = aloads_factory(CombinedParser)
+adump = adump_factory(dump)
+load_columnar = load_columnar_factory(CombinedParser)
+open_indexed = open_indexed_factory(CombinedParser)
@@ -0,0 +1,175 @@
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+from .records import JXONRecord
+from .lazy import LazyDict, LazyList
+from .xmlbackends import element_backend
+
+DIGEST_SIZE = 16
+DOUBLE = struct.Struct("<d")
+
+
+class FingerprintCache:
+    """
+    Remembers the digests of the arrays, objects and XML elements that have been
+    fingerprinted, so that fingerprinting a document again, or another document
+    sharing subtrees with it, only hashes the subtrees not seen before (as in a
+    Merkle tree). Subtrees are recognized by identity, so a container must not be
+    changed in place once fingerprinted with a cache unless it is forgotten
+    first; as a safeguard, a container whose length has changed is rehashed.
+
+    Cached containers are kept alive by the cache. At most maxsize of them are
+    kept, evicting the least recently used.
+    """
+
+    def __init__(self, maxsize=1 << 20):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, o):
+        with self.lock:
+            entry = self.entries.get(id(o))
+            if entry is None or entry[0] is not o or entry[1] != len(o):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(id(o))
+            self.hits += 1
+            return entry[2]
+
+    def store(self, o, digest):
+        with self.lock:
+            self.entries[id(o)] = (o, len(o), digest)
+            self.entries.move_to_end(id(o))
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def forget(self, o):
+        with self.lock:
+            entry = self.entries.get(id(o))
+            if entry is not None and entry[0] is o:
+                del self.entries[id(o)]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def string_bytes(s):
+    b = s.encode('utf-8', 'surrogatepass')
+    return str(len(b)).encode() + b':' + b
+
+
+def nullable_string_bytes(s):
+    return b'n' if s is None else b's' + string_bytes(s)
+
+
+def scalar_bytes(o):
+    # the encoding of a value that is not a container, or None if it is one
+    t = type(o)
+    if t is str:
+        return b's' + string_bytes(o)
+    elif t is int:
+        return b'i' + str(o).encode() + b';'
+    elif t is float:
+        # -0.0 == 0.0, so both are hashed alike
+        return b'f' + DOUBLE.pack(o if o else 0.0)
+    elif t is bool:
+        return b'T' if o else b'F'
+    elif o is None:
+        return b'n'
+    elif t is dict or t is list or isinstance(o, (JXONRecord, LazyDict, LazyList)) or element_backend(o) is not None:
+        return None
+    raise TypeError("Not a JXON value: " + repr(t))
+
+
+def start_hash(o):
+    # Returns a hash of everything about a container except its members, and an
+    # iterator over its members. Objects are hashed in key order, so that the
+    # order of keys doesn't matter, as in jxon_equal.
+    if type(o) is list or isinstance(o, LazyList):
+        h = hashlib.blake2b(b'[' + str(len(o)).encode() + b';', digest_size=DIGEST_SIZE)
+        return h, iter(o)
+
+    backend = element_backend(o)
+    if backend is not None:
+        h = hashlib.blake2b(b'<', digest_size=DIGEST_SIZE)
+        h.update(string_bytes(backend.tag(o)))
+        attributes = sorted(backend.items(o))
+        h.update(str(len(attributes)).encode() + b';')
+        for key, value in attributes:
+            h.update(string_bytes(key) + string_bytes(value))
+        h.update(nullable_string_bytes(o.text) + nullable_string_bytes(o.tail))
+        children = backend.children(o)
+        h.update(str(len(children)).encode() + b';')
+        return h, iter(children)
+
+    else:
+        h = hashlib.blake2b(b'{' + str(len(o)).encode() + b';', digest_size=DIGEST_SIZE)
+        keys = sorted(o.keys())
+        return h, ((key, o[key]) for key in keys)
+
+
+def is_object(o):
+    return not (type(o) is list or isinstance(o, LazyList) or element_backend(o) is not None)
+
+
+def digest(o, cache=None):
+    # The digest of o as bytes. Each container is hashed from the digests of the
+    # containers in it, so a cached digest stands for its whole subtree. Works
+    # with an explicit stack of [container, hash, members, is_object] frames.
+    encoded = scalar_bytes(o)
+    if encoded is not None:
+        return hashlib.blake2b(encoded, digest_size=DIGEST_SIZE).digest()
+
+    result = cache.get(o) if cache is not None else None
+    if result is not None:
+        return result
+
+    h, members = start_hash(o)
+    stack = [[o, h, members, is_object(o)]]
+    while True:
+        frame = stack[-1]
+        h = frame[1]
+        for member in frame[2]:
+            if frame[3]:
+                key, member = member
+                h.update(string_bytes(key))
+
+            encoded = scalar_bytes(member)
+            if encoded is not None:
+                h.update(encoded)
+                continue
+
+            member_digest = cache.get(member) if cache is not None else None
+            if member_digest is not None:
+                h.update(b'h' + member_digest)
+                continue
+
+            member_hash, member_members = start_hash(member)
+            stack.append([member, member_hash, member_members, is_object(member)])
+            break
+
+        else:
+            stack.pop()
+            result = h.digest()
+            if cache is not None:
+                cache.store(frame[0], result)
+            if not stack:
+                return result
+            stack[-1][1].update(b'h' + result)
+
+
+def fingerprint(o, cache=None):
+    # A stable digest of a JXON value, as a hex string, which is the same for any
+    # two values that are jxon_equal (objects are hashed regardless of key order)
+    # and almost certainly different otherwise
+    return digest(o, cache).hex()
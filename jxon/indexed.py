@@ -0,0 +1,174 @@
+import codecs
+import io
+import mmap
+import os
+import pickle
+import tempfile
+
+from .cache import file_version
+from .parser import CHUNK_SIZE, import_stack
+
+# bumped whenever the layout of index sidecar files changes
+INDEX_FORMAT = 1
+INDEX_EXTENSION = ".index"
+
+
+class IndexedDocument:
+    """
+    A JXON file whose default export, an array or object, is read member by
+    member on demand. The file is memory-mapped, and an index of the byte
+    offsets of the members is built in one pass over it (or read from a sidecar
+    file written by an earlier pass), so that looking up a member only decodes
+    that member.
+
+    Indexing an array gives its elements and indexing an object gives the value
+    of a key, as with a list or dict; iterating gives elements or keys
+    respectively. Members are decoded afresh on every lookup. Only the
+    syntax of the file is checked when it is indexed; the consistency of the
+    types of array elements is not.
+    """
+
+    def __init__(self, filepath, parser_class, sidecar=True, chunk_size=CHUNK_SIZE):
+        self.filepath = os.path.abspath(filepath)
+        self.parser_class = parser_class
+        self.curr_dir = os.path.dirname(self.filepath)
+
+        with open(self.filepath, 'rb') as fh:
+            version = file_version(self.filepath)
+            # empty files can't be mapped, and have no default export anyway
+            self.mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if version[1] else None
+
+        if sidecar is True:
+            sidecar = self.filepath + INDEX_EXTENSION
+
+        importing = import_stack()
+        importing.append(self.filepath)
+        try:
+            start, keys, offsets = self.read_or_build_index(sidecar, version, chunk_size)
+        except BaseException:
+            self.close()
+            raise
+        finally:
+            importing.pop()
+
+        self.keys_index = None if keys is None else {key: i for i, key in enumerate(keys)}
+        self.member_keys = keys
+        self.offsets = offsets
+
+    def read_or_build_index(self, sidecar, version, chunk_size):
+        index = read_index(sidecar, version, self.parser_class) if sidecar else None
+        if index is not None:
+            start, keys, offsets = index
+            # the values of variables are needed to decode members that refer to them
+            parser = self.parser_class(self.mmap[:start].decode('utf-8'), self.curr_dir)
+            parser.read_header()
+            self.module = parser.module
+            return index
+
+        parser = self.parser_class("", curr_dir=self.curr_dir)
+        stream = codecs.getreader('utf-8')(self.mmap) if self.mmap is not None else io.StringIO()
+        start, keys, offsets = parser.scan_members(stream, chunk_size=chunk_size)
+        self.module = parser.module
+        if sidecar:
+            write_index(sidecar, (INDEX_FORMAT, version, index_key(self.parser_class), start, keys, offsets))
+        return start, keys, offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, key):
+        if self.keys_index is not None:
+            return self.decode(self.keys_index[key])
+
+        if type(key) is slice:
+            return [self.decode(i) for i in range(len(self))[key]]
+        try:
+            return self.decode(range(len(self))[key])
+        except IndexError:
+            raise IndexError("IndexedDocument index out of range") from None
+
+    def __contains__(self, key):
+        if self.keys_index is not None:
+            return key in self.keys_index
+        return any(key == e for e in self)
+
+    def __iter__(self):
+        if self.keys_index is not None:
+            return iter(self.member_keys)
+        return (self.decode(i) for i in range(len(self)))
+
+    def is_array(self):
+        return self.keys_index is None
+
+    def keys(self):
+        if self.keys_index is None:
+            raise TypeError("The default export is an array")
+        return list(self.member_keys)
+
+    def get(self, key, default=None):
+        if self.keys_index is None:
+            raise TypeError("The default export is an array")
+        return self[key] if key in self.keys_index else default
+
+    def decode(self, i):
+        # the member's slice of the file may run on past the member itself, into
+        # the separator and the next key, which the parser simply stops short of
+        start, end = self.offsets[i], self.offsets[i + 1]
+        parser = self.parser_class(self.mmap[start:end].decode('utf-8'), self.curr_dir)
+        parser.module = self.module
+        return parser.grab_element()
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def index_key(parser_class):
+    return parser_class.__module__ + "." + parser_class.__qualname__
+
+
+def read_index(sidecar, version, parser_class):
+    # An index is only used if it was built by the same kind of parser from a file
+    # with the same modification time and size
+    try:
+        with open(sidecar, 'rb') as fh:
+            index_format, index_version, key, start, keys, offsets = pickle.load(fh)
+    except Exception:
+        # a missing, unreadable or corrupt index is simply rebuilt
+        return None
+
+    if index_format != INDEX_FORMAT or index_version != version or key != index_key(parser_class):
+        return None
+    return start, keys, offsets
+
+
+def write_index(sidecar, index):
+    directory = os.path.dirname(sidecar) or "."
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(index, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, sidecar)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    except OSError:
+        # the index can always be rebuilt; failing to write it is not an error
+        pass
+
+
+def open_indexed_factory(parser_class):
+    def open_indexed(filepath, sidecar=True, chunk_size=CHUNK_SIZE):
+        # sidecar is the path of the file the index is kept in, by default the
+        # path of the file with ".index" appended, or False to not keep one
+        return IndexedDocument(filepath, parser_class, sidecar=sidecar, chunk_size=chunk_size)
+
+    return open_indexed
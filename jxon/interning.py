@@ -0,0 +1,54 @@
+class Interner:
+    """
+    A table of strings shared by everything a parse produces, so that equal
+    object keys and XML tag and attribute names are one string object each
+    rather than a separate copy per occurrence. If max_string_length is set,
+    string values no longer than it are shared too, which suits repetitive,
+    enum-like values.
+
+    Once maxsize strings are in the table, new strings are no longer added to
+    it, so that documents with many distinct keys don't make it grow without
+    bound. An Interner may be passed to several parses to share strings between
+    their results.
+    """
+
+    def __init__(self, maxsize=1 << 16, max_string_length=0):
+        self.maxsize = maxsize
+        self.max_string_length = max_string_length
+        self.strings = {}
+
+    def __call__(self, s):
+        if len(self.strings) < self.maxsize:
+            return self.strings.setdefault(s, s)
+        return self.strings.get(s, s)
+
+    def value(self, s):
+        return self(s) if len(s) <= self.max_string_length else s
+
+    def object_pairs(self, pairs):
+        # Builds an object decoded by the JSON fast path. The table may end up
+        # exceeding maxsize by the keys of one object.
+        strings = self.strings
+        intern = strings.setdefault if len(strings) < self.maxsize else strings.get
+        limit = self.max_string_length
+        if limit:
+            d = {intern(key, key): intern(v, v) if type(v) is str and len(v) <= limit else v for key, v in pairs}
+        else:
+            d = {intern(key, key): v for key, v in pairs}
+
+        if len(d) != len(pairs):
+            # a repeated key, which makes the fast path leave the object to the
+            # regular parser to report
+            raise ValueError("Repeat key")
+        return d
+
+    def __len__(self):
+        return len(self.strings)
+
+
+def make_interner(intern):
+    # intern is either an Interner, True for a default one, or None or False for
+    # none at all
+    if intern is None or intern is False:
+        return None
+    return Interner() if intern is True else intern
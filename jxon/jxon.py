@@ -1,15 +1,23 @@
+import json
+import re
+import uuid
 from xml.etree import ElementTree as ET
+from xml.parsers import expat
 
-from .parser import Parser, DIGITS, LETTERS, jxon_string_escape
+from .parser import Parser, DIGITS, LABEL_START, DIGIT_RUN, WHITESPACE_RUN, jxon_string_escape
+from .records import JXONRecord
+from .lazy import LazyContainer, LazyDict, LazyList, LazyElement
+from .fingerprint import digest
+from .xmlbackends import ETREE_BACKEND, element_backend
 
 
-XML_ENTITIES = {
-    'lt': '<',
-    'gt': '>',
-    'amp': '&',
-    'apos': '\'',
-    'quot': '"'
-}
+NUMBER_START = DIGITS | {'-'}
+
+# XML elements are fed to expat this many characters at a time to begin with
+XML_CHUNK_SIZE = 1 << 10
+# a line break in XML text, along with the whitespace and comments after it
+XML_LINE_BREAK = re.compile(r'\n(?:[ \t\r\n]+|//[^\n]*|/\*.*?\*/)*', re.DOTALL)
+LEADING_SPACES = re.compile(r' *')
 
 
 class JXONParseException(BaseException):
@@ -19,242 +27,352 @@ class JXONParseException(BaseException):
 class JXONParser(Parser):
     exception_class = JXONParseException
     permit_type_annotation = True
+    json_fast_path = True
 
     def grab_value(self):
-        if self.next() == "{":
-            return self.grab_object()
-        elif self.next() == "[":
-            return self.grab_array()
-        elif self.next() == '"':
-            return self.grab_string(allow_lb=True)
-        elif self.next() in DIGITS | {'-'}:
+        c = self.next()
+        if c == '"':
+            s = self.grab_string(allow_lb=True)
+            return s if self.interner is None else self.interner.value(s)
+        elif c in NUMBER_START:
             return self.grab_number()
-        elif self.next() == '<':
-            return self.grab_xml(allow_tail=False)
+        elif c == '<':
+            return self.grab_xml()
 
-        elif self.next(4) == "true":
+        elif self.text.startswith("true", self.pos):
             self.advance(4)
             return True
-        elif self.next(5) == "false":
+        elif self.text.startswith("false", self.pos):
             self.advance(5)
             return False
-        elif self.next(4) == "null":
+        elif self.text.startswith("null", self.pos):
             self.advance(4)
             return None
 
-        elif self.next() in LETTERS | {'_'}:
+        elif c in LABEL_START:
             return self.resolve_variable()
 
         else:
             self.throw_exception("Unknown expression type")
 
-    def grab_array(self):
-        self.expect("[")
-
-        self.pass_whitespace()
-        if self.next() == "]":
-            self.advance()
-            return []
-
-        d = self.grab_elements()
-
-        self.expect(']')
-
-        return d
-
     def grab_number(self):
-        s = ""
-        if self.next() == '-':
-            s += '-'
+        text = self.text
+        start = self.pos
+        is_float = False
+
+        if text[self.pos] == '-':
             self.advance()
 
-        s += self.grab_digits()
+        if self.grab_digits() == '':
+            self.throw_exception("Expected digits")
 
-        if self.next() == '.':
-            s += '.'
+        if text[self.pos] == '.':
+            is_float = True
             self.advance()
-            s += self.grab_digits(zerostart=True)
+            self.grab_digits(zerostart=True)
 
-        if self.next() in 'Ee':
-            s += 'e'
+        if text[self.pos] in 'Ee':
+            is_float = True
             self.advance()
-            if self.next() in '+-':
-                s += self.next()
+            if text[self.pos] in '+-':
                 self.advance()
             else:
                 self.throw_exception("Exponent must be followed by sign")
-            s += self.grab_digits(zerostart=True)
+            if self.grab_digits(zerostart=True) == '':
+                self.throw_exception("Expected digits")
 
-        return eval(s)
+        s = text[start:self.pos]
+        return float(s) if is_float else int(s)
 
     def grab_digits(self, zerostart=False):
-        if (not zerostart) and self.next() == '0':
+        start = self.pos
+        if (not zerostart) and self.text[start] == '0':
             self.advance()
             return '0'
 
-        s = ''
-        while self.next(permit_eol=True) in DIGITS:
-            s += self.next()
-            self.advance()
-        return s
-
-    def grab_xml(self, allow_tail):
-        self.expect("<")
-        name = self.grab_xml_name()
-        self.pass_whitespace()
-
-        attributes = {}
-        while self.next() not in ('/', '>'):
-            key, value = self.grab_xml_attribute()
-            if key in attributes:
-                self.throw_exception("Repeated attribute name")
-            attributes[key] = value
-            self.pass_whitespace()
-
-        e = ET.Element(name, attrib=attributes)
-
-        if self.next() == '/':
-            self.advance()
-            self.expect('>')
+        self.pos = DIGIT_RUN.match(self.text, start).end()
+        return self.text[start:self.pos]
+
+    def grab_xml(self):
+        # The element is handed to expat a chunk at a time, from the cursor on,
+        # until its end tag has been parsed, which is where the cursor ends up.
+        # Whatever expat makes of the text after that is of no concern here.
+        # With lazy_xml set, the element is only checked to be well-formed, and
+        # built from its text once it is looked into.
+        text = self.text
+        start = self.pos
+        builder = XMLScanner() if self.lazy_xml else XMLBuilder(self.xml_backend, self.interner)
+        end = start
+        chunk_size = XML_CHUNK_SIZE
+        try:
+            while builder.end is None:
+                chunk = text[end:end+chunk_size]
+                end += len(chunk)
+                chunk_size *= 2
+                builder.feed(chunk, end >= len(text))
+        except expat.ExpatError as e:
+            if builder.end is None:
+                if self.stream is not None:
+                    # the element may only be cut off by the end of the window
+                    # of a stream, so the step is retried with more of it
+                    self.pos = len(text)
+                    self.throw_exception("Invalid XML: " + expat.ErrorString(e.code))
+                self.throw_exception("Invalid XML: " + expat.ErrorString(e.code),
+                                     bp=self.xml_error_position(start, e.lineno, e.offset))
+        except ValueError as e:
+            # an element the backend can't represent
+            self.throw_exception("Invalid XML: " + str(e), bp=self.xml_error_position(start, *builder.error_position))
+
+        self.pos = start + builder.end_position()
+        if self.lazy_xml:
+            return LazyElement(self.lazy_source(), start, self.pos)
+        return builder.root
+
+    def xml_error_position(self, start, line, column):
+        # expat counts lines and columns (from 1 and 0) from where it was started
+        pos = start
+        for _ in range(line - 1):
+            pos = self.text.find("\n", pos) + 1
+            if pos == 0:
+                return len(self.text)
+        return min(pos + column, len(self.text))
+
+
+class XMLScanner:
+    # Follows the events of an expat parser only as far as needed to find where
+    # the root element ends
+
+    def __init__(self):
+        self.parser = expat.ParserCreate(encoding="utf-8")
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end_element
+        self.parser.CharacterDataHandler = self.characters
+        # everything fed to the parser so far, as expat's byte offsets index into it
+        self.fed = bytearray()
+        self.depth = 0
+        # whether nothing has come since the start tag of the innermost element
+        self.in_text = False
+        # the byte offset just past the root element, once it has been parsed
+        self.end = None
+
+    def feed(self, s, final):
+        data = s.encode('utf-8', 'surrogatepass')
+        self.fed += data
+        self.parser.Parse(data, final)
+
+    def end_position(self):
+        # the end of the root element as an offset into the text that was fed
+        return len(self.fed[:self.end].decode('utf-8', 'surrogatepass'))
+
+    def is_self_closing(self, index):
+        # expat reports the end of a self-closing element at the end of its tag,
+        # and that of any other at the start of its end tag
+        return self.in_text and self.fed[index-2:index] == b"/>"
+
+    def set_end(self, index, self_closing):
+        self.end = index if self_closing else self.fed.index(b">", index) + 1
+
+    def start(self, name, attributes):
+        self.depth += 1
+        self.in_text = True
+
+    def characters(self, data):
+        self.in_text = False
+
+    def end_element(self, name):
+        self.depth -= 1
+        if self.depth == 0:
+            index = self.parser.CurrentByteIndex
+            self.set_end(index, self.is_self_closing(index))
+        self.in_text = False
+
+
+class XMLBuilder(XMLScanner):
+    # Builds a tree of XML elements from the events of an expat parser. Text and tails
+    # are normalized as JXON always has: each line break, together with the
+    # whitespace and comments after it, stands for a single space, whitespace at
+    # the start of an element's text is dropped, and so is whitespace at the end
+    # of its last child's tail, or of its text if it has no children. Elements
+    # that aren't self-closing always have text, and every element but the root
+    # has a tail, if only an empty one.
+
+    def __init__(self, backend=ETREE_BACKEND, interner=None):
+        super().__init__()
+        self.backend = backend
+        self.interner = interner
+        self.stack = []
+        self.chunks = []
+        self.parser.CharacterDataHandler = self.chunks.append
+        self.root = None
+        # the element whose text or tail the text since the last event belongs to
+        self.last = None
+        # the line and column of the element the backend turned down, if any
+        self.error_position = None
+
+    def flush(self):
+        # gives the text since the last event to the element it belongs to
+        chunks = self.chunks
+        if chunks:
+            data = "".join(chunks)
+            chunks.clear()
+            if self.in_text:
+                data = data[WHITESPACE_RUN.match(data).end():]
+            if "\n" in data:
+                data = XML_LINE_BREAK.sub(' ', data)
+        else:
+            data = ""
 
+        if self.in_text:
+            self.last.text = data
         else:
-            self.expect('>')
-            self.pass_whitespace()
-            e.text = self.grab_xml_text()
-
-            children = []
-            while self.next(2) != "</":
-                # TODO: pull into own function?
-                if self.next(2) == "<!":
-                    self.pass_comment()
-                children.append(self.grab_xml(allow_tail=True))
-            if len(children) > 0:
-                children[-1].tail = children[-1].tail.rstrip()
-                e.extend(children)
+            self.last.tail = data
+
+    def start(self, name, attributes):
+        if self.last is not None:
+            self.flush()
+        if self.interner is not None:
+            name = self.interner(name)
+            attributes = {self.interner(key): value for key, value in attributes.items()}
+
+        stack = self.stack
+        try:
+            if stack:
+                e = self.backend.sub_element(stack[-1], name, attributes)
             else:
+                e = self.root = self.backend.element(name, attributes)
+        except ValueError:
+            self.error_position = (self.parser.CurrentLineNumber, self.parser.CurrentColumnNumber)
+            raise
+        stack.append(e)
+        self.last = e
+        self.in_text = True
+
+    def end_element(self, name):
+        e = self.stack.pop()
+        index = self.parser.CurrentByteIndex
+        self_closing = not self.chunks and self.is_self_closing(index)
+        if not self_closing:
+            self.flush()
+            # the text of e if it has no children, and otherwise its last child's tail
+            if self.in_text:
                 e.text = e.text.rstrip()
+            else:
+                self.last.tail = self.last.tail.rstrip()
 
-            self.expect('</')
-            close_name = self.grab_xml_name()
-            if close_name != name:
-                self.throw_exception("Mismatched XML tag, expecting a " + name)
-            self.pass_whitespace()
-            self.expect('>')
+        self.backend.close(e)
+        self.last = e
+        self.in_text = False
+        if not self.stack:
+            self.set_end(index, self_closing)
 
-        if allow_tail:
-            e.tail = self.grab_xml_text()
 
-        return e
+class JXONEncodeException(BaseException):
+    pass
 
-    def grab_xml_name(self):
-        if self.next() not in (LETTERS | {':', '_'}):
-            self.throw_exception("Invalid start to XML name")
 
-        s = ""
-        while self.next() in (LETTERS | DIGITS | {':', '_', '.', '-'}):
-            # TODO: CombiningChar, Extender
-            s += self.next()
-            self.advance()
+WRITE_BUFFER_SIZE = 1 << 16
+# iterencode hands arrays and objects with at most this many members to the json
+# module's encoder in one go, and streams larger ones member by member
+JSON_CHUNK_MEMBERS = 1000
 
-        return s
 
-    def grab_xml_attribute(self):
-        key = self.grab_xml_name()
-        # TODO: keep whitespace allowance here?
-        self.pass_whitespace()
-        self.expect('=')
-        self.pass_whitespace()
-        self.expect('"')
+def jxon_kind(o):
+    # records and lazy proxies are compared and encoded as the containers they
+    # stand for, and elements of every XML backend as XML
+    if isinstance(o, (JXONRecord, LazyDict)):
+        return dict
+    elif isinstance(o, LazyList):
+        return list
+    elif element_backend(o) is not None:
+        return ET.Element
+    return type(o)
 
-        value = ""
-        while self.next() != '"':
-            value += self.grab_xml_attr_char()
-        self.expect('"')
 
-        return key, value
+def copies_verbatim(indent, sort_keys, separators):
+    # untouched JSON proxies are copied from their source as they are, unless the
+    # output is to be formatted
+    return indent is None and not sort_keys and separators is None
 
-    def grab_xml_attr_char(self):
-        if self.next() == '<':
-            self.throw_exception("'<' cannot occur in XML attribute")
 
-        elif self.next() == '&':
-            return self.grab_xml_reference()
+SCALAR_TYPES = frozenset({int, float, str, bool, type(None)})
+IS_STR = str.__instancecheck__
 
-        else:
-            c = self.next()
-            self.advance()
-            return c
 
-    def grab_xml_reference(self):
-        self.expect('&')
-        if self.next() == '#':
-            # TODO: CharRef
-            pass
-        else:
-            entity = self.grab_xml_name()
-            c = self.resolve_entity(entity)
+def jxon_equal(o1, o2, cache=None):
+    # Both values are walked with an explicit stack of pairs of containers,
+    # stopping at the first difference and skipping subtrees shared by both.
+    # Members that aren't containers are compared on the spot. With a
+    # FingerprintCache, values whose fingerprints differ are told apart without
+    # the walk, which only takes hashing the parts of them not already in the
+    # cache; matching fingerprints are still checked by walking, as a cached
+    # fingerprint may be out of date.
+    if cache is not None and digest(o1, cache) != digest(o2, cache):
+        return False
 
-        self.expect(';')
-        return c
+    stack = [(o1, o2)]
+    while stack:
+        o1, o2 = stack.pop()
+        t = jxon_kind(o1)
+        if t is not jxon_kind(o2):
+            return False
 
-    def resolve_entity(self, entity):
-        if entity in XML_ENTITIES:
-            return XML_ENTITIES[entity]
+        if t in SCALAR_TYPES:
+            if o1 != o2:
+                return False
+            continue
+        elif o1 is o2:
+            continue
+
+        if t is list:
+            if len(o1) != len(o2):
+                return False
+            pairs = zip(o1, o2)
+        elif t is dict:
+            if len(o1) != len(o2) or any(key not in o2 for key in o1):
+                return False
+            pairs = ((o1[key], o2[key]) for key in o1)
+        elif t is ET.Element:
+            b1, b2 = element_backend(o1), element_backend(o2)
+            if b1.tag(o1) != b2.tag(o2) or dict(b1.items(o1)) != dict(b2.items(o2)):
+                return False
+            children1, children2 = b1.children(o1), b2.children(o2)
+            if o1.text != o2.text or o1.tail != o2.tail or len(children1) != len(children2):
+                return False
+            pairs = zip(children1, children2)
         else:
-            # TODO: Entity Declaration
-            self.throw_exception('Invalid entity')
-
-    def grab_xml_text(self):
-        value = ""
-        while self.eol() or self.next() != '<':
-            if self.eol():
-                self.pass_whitespace()
-                value += ' '
+            raise JXONEncodeException("Not parseable as a JXON type: " + repr(t))
+
+        for e1, e2 in pairs:
+            t = type(e1)
+            if t in SCALAR_TYPES:
+                if t is not type(e2) or e1 != e2:
+                    return False
             else:
-                value += self.grab_xml_attr_char()
-            # TODO: Proper content parsing
-        return value
-
-    def pass_comment(self):
-        self.expect('<!--')
-        self.pass_whitespace()
-        while self.next(3) != "-->":
-            self.advance()
-        self.advance(3)
-        self.pass_whitespace()
+                stack.append((e1, e2))
 
+    return True
 
-class JXONEncodeException(BaseException):
-    pass
 
+def xml_text_escape(s):
+    return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
 
-def jxon_equal(o1, o2):
-    if type(o1) is not type(o2):
-        return False
-    t = type(o1)
-
-    if t in {int, float, str, bool, type(None)}:
-        return o1 == o2
-    elif t is list:
-        return all(jxon_equal(*pair) for pair in zip(o1, o2))
-    elif t is dict:
-        return set(o1.keys()) == set(o2.keys()) and all(jxon_equal(o1[key], o2[key]) for key in o1)
-    elif t is ET.Element:
-        if o1.tag != o2.tag:
-            return False
-        if dict(o1.items()) != dict(o2.items()):
-            return False
-        if o1.text != o2.text:
-            return False
-        if o1.tail != o2.tail:
-            return False
-        return all(jxon_equal(*pair) for pair in zip(o1, o2))
-    else:
-        raise JXONEncodeException("Not parseable as a JXON type: " + repr(t))
 
+def xml_attribute_escape(s):
+    # Whitespace other than spaces is escaped too, as XML parsers turn it into
+    # spaces in attribute values
+    s = xml_text_escape(s).replace('"', "&quot;")
+    return s.replace("\n", "&#10;").replace("\r", "&#13;").replace("\t", "&#9;")
+
+
+def starts_in_space(s):
+    # Whether s starts with a lone space. A line break in XML text reads back as
+    # a single space, so when indenting, lines are only broken at lone spaces.
+    return s.startswith(' ') and not s[1:2].isspace()
 
-def xml_text_escape(s):
-    return s  # TODO
+
+def ends_in_space(s):
+    return s.endswith(' ') and not s[-2:-1].isspace()
 
 
 def dumps_helper(o, indent, sort_keys, indent_level):
@@ -269,13 +387,19 @@ def dumps_helper(o, indent, sort_keys, indent_level):
     elif o is None:
         return 'null'
 
-    elif type(o) is ET.Element:
+    elif jxon_kind(o) is ET.Element:
+        if isinstance(o, LazyElement) and o.verbatim() is not None:
+            return o.verbatim()
+
+        backend = element_backend(o)
+        tag = backend.tag(o)
+        children = list(backend.children(o))
         s = "<"
-        s += o.tag
-        for key, value in o.items():
-            s += ' ' + key + '="' + jxon_string_escape(value) + '"'
+        s += tag
+        for key, value in backend.items(o):
+            s += ' ' + key + '="' + xml_attribute_escape(value) + '"'
 
-        if not o.text and len(list(o)) == 0:
+        if not o.text and len(children) == 0:
             s += '/>'
         else:
             s += '>'
@@ -286,14 +410,14 @@ def dumps_helper(o, indent, sort_keys, indent_level):
 
                 s += xml_text_escape(o.text)
 
-            if list(o):
-                if indent is not None and (o.text == "" or o.text[-1] in {' ', '\t', '\r', '\n'}):
+            if children:
+                if indent is not None and (not o.text or ends_in_space(o.text)):
                     s = s.rstrip()
                     s += '\n'
                     s += ' ' * (indent * (indent_level+1))
 
-                for i, e in enumerate(o):
-                    if indent is not None and i != 0:
+                for i, e in enumerate(children):
+                    if indent is not None and i != 0 and ends_in_space(children[i-1].tail or ""):
                         s += '\n'
                         s += ' ' * (indent * (indent_level+1))
 
@@ -303,89 +427,255 @@ def dumps_helper(o, indent, sort_keys, indent_level):
                 s += '\n'
                 s += ' ' * (indent * indent_level)
 
-            s += "</" + o.tag + '>'
+            s += "</" + tag + '>'
 
         if o.tail:
-            if indent is not None and o.tail[0] in {' ', '\t', '\r', '\n'}:
+            if indent is not None and starts_in_space(o.tail):
                 s += '\n'
                 s += ' ' * (indent * indent_level)
-                s += xml_text_escape(o.tail.lstrip())
+                s += xml_text_escape(o.tail[1:])
             else:
                 s += xml_text_escape(o.tail)
 
-            if indent is not None:
+            if indent is not None and ends_in_space(o.tail):
                 s = s.rstrip()
 
         return s
 
-    elif type(o) is dict:
-        if o == {}:
+    elif jxon_kind(o) is dict:
+        if len(o) == 0:
             return '{}'
 
-        s = '{'
-        if indent is not None:
-            s += '\n'
+        return "".join(iterencode_helper(o, indent=indent, sort_keys=sort_keys, indent_level=indent_level))
+
+    elif jxon_kind(o) is list:
+        if len(o) == 0:
+            return '[]'
 
+        return "".join(iterencode_helper(o, indent=indent, sort_keys=sort_keys, indent_level=indent_level))
+
+    else:
+        raise JXONEncodeException(repr(o) + " cannot be encoded into JXON")
+
+
+def container_chunks(o, indent, sort_keys, indent_level, encode, separators=None):
+    # Yields the encoding of a non-empty array or object as strings, except for
+    # nested containers, which are yielded as chunk iterators of their own for
+    # iter_chunks to expand. encode(value, indent_level) returns either a string
+    # or such an iterator.
+    item_separator, key_separator = resolve_separators(indent, separators)
+
+    is_object = type(o) is dict or isinstance(o, JXONRecord)
+    if is_object:
+        check_keys(o)
+        opener, closer = '{', '}'
         items = o.items()
         if sort_keys:
             items = sorted(list(items), key=lambda x: x[0])
-        for key, value in items:
-            if indent is not None:
-                s += ' ' * (indent * (indent_level+1))
+    else:
+        opener, closer = '[', ']'
+        items = ((None, e) for e in o)
+
+    if indent is not None:
+        yield opener + '\n'
+        separator = item_separator + '\n' + ' ' * (indent * (indent_level+1))
+        first_separator = ' ' * (indent * (indent_level+1))
+        closer = '\n' + ' ' * (indent * indent_level) + closer
+    else:
+        yield opener
+        separator = item_separator
+        first_separator = ''
+
+    for i, (key, value) in enumerate(items):
+        chunk = first_separator if i == 0 else separator
+        if is_object:
+            chunk += '"' + jxon_string_escape(key) + '"' + key_separator
+
+        encoded = encode(value, indent_level+1)
+        if type(encoded) is str:
+            yield chunk + encoded
+        else:
+            yield chunk
+            yield encoded
+
+    yield closer
+
+
+def check_keys(o):
+    # the json module would quietly turn numbers, booleans and null into strings
+    if not all(map(IS_STR, o)):
+        key = next(key for key in o if not isinstance(key, str))
+        raise JXONEncodeException("Object keys must be strings: " + repr(key))
+
+
+def fits_in_chunk(o, limit):
+    # Whether the array or object o has no more than limit members in all, counting
+    # those of everything nested in it, so that the json module may encode it in
+    # one go; with limit None, any size does. Checks the keys of the objects it
+    # goes through on the way.
+    stack = [o]
+    size = 0
+    while stack:
+        o = stack.pop()
+        t = type(o)
+        if t is dict:
+            check_keys(o)
+            members = o.values()
+        elif t is list:
+            members = o
+        else:
+            members = tuple(o.values())
 
-            s += '"' + jxon_string_escape(key) + '"'
-            s += ': '
-            s += dumps_helper(value, indent=indent, sort_keys=sort_keys, indent_level=indent_level+1)
-            s += ','
+        size += len(members)
+        if limit is not None and size > limit:
+            return False
+        for e in members:
+            t = type(e)
+            if t is dict or t is list or (t not in SCALAR_TYPES and isinstance(e, JXONRecord)):
+                stack.append(e)
+    return True
+
+
+def resolve_separators(indent, separators):
+    if separators is not None:
+        return separators
+    elif indent is None:
+        return ', ', ': '
+    else:
+        return ',', ': '
+
+
+def json_encode(o, indent, sort_keys, indent_level, separators=None):
+    # Encodes an array or object with the json module's encoder. XML elements are
+    # swapped out for unique marker strings, which are then replaced with their
+    # encoding at the indentation level they ended up at. Returns None if the
+    # json module would encode something differently (NaN and infinities).
+    token = uuid.uuid4().hex
+    elements = []
+    verbatim = copies_verbatim(indent, sort_keys, separators)
+
+    def default(e):
+        if element_backend(e) is not None or (isinstance(e, LazyContainer) and verbatim and e.verbatim() is not None):
+            elements.append(e)
+            return "\0" + token + str(len(elements) - 1)
+        if isinstance(e, JXONRecord):
+            return dict(e.items())
+        if isinstance(e, LazyContainer):
+            return e.members()
+        raise JXONEncodeException(repr(e) + " cannot be encoded into JXON")
+
+    encoder = json.JSONEncoder(
+        ensure_ascii=False,
+        check_circular=False,
+        allow_nan=False,
+        sort_keys=sort_keys,
+        indent=indent,
+        separators=resolve_separators(indent, separators),
+        default=default
+    )
+
+    try:
+        s = encoder.encode(o)
+    except ValueError:
+        return None
+
+    if indent and indent_level:
+        s = s.replace('\n', '\n' + ' ' * (indent * indent_level))
+
+    if not elements:
+        return s
 
-            if indent is not None:
-                s += '\n'
-            else:
-                s += ' '
+    def replace(m):
+        level = 0
+        if indent:
+            line_start = s.rfind('\n', 0, m.start()) + 1
+            level = (LEADING_SPACES.match(s, line_start).end() - line_start) // indent
+        e = elements[int(m.group(1))]
+        if isinstance(e, LazyContainer):
+            return e.verbatim()
+        return dumps_helper(e, indent=indent, sort_keys=sort_keys, indent_level=level)
+
+    return re.sub('"\\\\u0000' + token + '([0-9]+)"', replace, s)
+
+
+def iter_chunks(encoded):
+    # Expands nested chunk iterators with an explicit stack instead of recursion
+    if type(encoded) is str:
+        yield encoded
+        return
+
+    stack = [encoded]
+    while stack:
+        chunk = next(stack[-1], None)
+        if chunk is None:
+            stack.pop()
+        elif type(chunk) is str:
+            yield chunk
+        else:
+            stack.append(chunk)
 
-        s = s[:-2]
-        if indent is not None:
-            s += '\n' + ' ' * (indent * indent_level)
 
-        s += '}'
+def iterencode_helper(o, indent, sort_keys, indent_level, separators=None, chunk_members=JSON_CHUNK_MEMBERS):
+    # Arrays and objects with no more than chunk_members members, nested ones
+    # included, are encoded whole by the json module; larger ones are streamed a
+    # member at a time. With chunk_members set to None, the whole object is
+    # encoded in one go.
+    use_json = True
+    verbatim = copies_verbatim(indent, sort_keys, separators)
 
-        return s
+    def encode(value, level):
+        nonlocal use_json
 
-    elif type(o) is list:
-        if o == []:
-            return '[]'
+        if isinstance(value, LazyContainer):
+            encoded = value.verbatim() if verbatim else None
+            if encoded is not None:
+                return encoded
+            value = value.members()
 
-        s = '['
-        if indent is not None:
-            s += '\n'
+        if (type(value) is dict or type(value) is list or isinstance(value, JXONRecord)) and len(value) > 0:
+            if use_json and fits_in_chunk(value, chunk_members):
+                try:
+                    encoded = json_encode(value, indent=indent, sort_keys=sort_keys,
+                                          indent_level=level, separators=separators)
+                except RecursionError:
+                    # too deeply nested for the json module, so stop trying it
+                    use_json = False
+                    encoded = None
 
-        for e in o:
-            if indent is not None:
-                s += ' ' * (indent * (indent_level+1))
+                if encoded is not None:
+                    return encoded
 
-            s += dumps_helper(e, indent=indent, sort_keys=sort_keys, indent_level=indent_level+1)
-            s += ','
+            return container_chunks(value, indent=indent, sort_keys=sort_keys, indent_level=level,
+                                    encode=encode, separators=separators)
 
-            if indent is not None:
-                s += '\n'
-            else:
-                s += ' '
+        return dumps_helper(value, indent=indent, sort_keys=sort_keys, indent_level=level)
 
-        s = s[:-2]
-        if indent is not None:
-            s += '\n' + ' ' * (indent * indent_level)
+    return iter_chunks(encode(o, indent_level))
 
-        s += ']'
 
-        return s
+def iterencode(obj, indent=None, sort_keys=False, separators=None):
+    return iterencode_helper(obj, indent=indent, sort_keys=sort_keys, indent_level=0, separators=separators)
 
-    else:
-        raise JXONEncodeException(repr(o) + " cannot be encoded into JXON")
+
+def write_chunks(chunks, fp):
+    # Collects chunks into writes of about WRITE_BUFFER_SIZE characters
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= WRITE_BUFFER_SIZE:
+            fp.write("".join(buffer))
+            buffer = []
+            size = 0
+
+    fp.write("".join(buffer))
 
 
-def dumps(obj, indent=None, sort_keys=False):
-    return dumps_helper(obj, indent=indent, sort_keys=sort_keys, indent_level=0)
+def dumps(obj, indent=None, sort_keys=False, separators=None):
+    return "".join(iterencode_helper(obj, indent=indent, sort_keys=sort_keys, indent_level=0,
+                                     separators=separators, chunk_members=None))
 
 
-def dump(obj, fp, indent=None, sort_keys=False):
-    fp.write(dumps(obj, indent=indent, sort_keys=sort_keys))
+def dump(obj, fp, indent=None, sort_keys=False, separators=None):
+    write_chunks(iterencode(obj, indent=indent, sort_keys=sort_keys, separators=separators), fp)
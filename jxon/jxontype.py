@@ -1,5 +1,8 @@
+from collections.abc import Mapping
 from xml.etree import ElementTree as ET
 
+from .xmlbackends import is_element
+
 
 class JXONSchemaValidityException(BaseException):
     pass
@@ -44,7 +47,8 @@ class JXONType:
             return True
 
         if self.jxon_type in JXONType.SIMPLE_TYPES:
-            return type(obj) is self.jxon_type
+            # the XML type, ET.Element, stands for the elements of every XML backend
+            return type(obj) is self.jxon_type or (self.jxon_type is ET.Element and is_element(obj))
 
         elif self.jxon_type is list:
             if type(obj) is not list:
@@ -59,7 +63,8 @@ class JXONType:
             return all(self.subtype.is_jxon_instance(e) for e in obj)
 
         elif self.jxon_type is dict:
-            if type(obj) is not dict:
+            # records, and mappings in general, stand for objects as well as dicts
+            if type(obj) is not dict and not isinstance(obj, Mapping):
                 return False
 
             if set(self.subtype.keys()) != set(obj.keys()):
@@ -81,34 +86,221 @@ class JXONType:
         else:
             raise RuntimeError("??")
 
+    def compile(self):
+        # Returns a function equivalent to is_jxon_instance (without fill_null),
+        # generated once for this particular type, which is much faster to call
+        # repeatedly. Changes to the type afterwards do not affect the function.
+        return ValidatorCompiler().compile(self)
+
+
+# Generated code is split into separate functions beyond this depth of nesting,
+# to stay clear of Python's limits on nested blocks
+MAX_VALIDATOR_DEPTH = 16
+
+
+class ValidatorCompiler:
+    def __init__(self):
+        self.namespace = {"Element": ET.Element, "is_element": is_element, "Mapping": Mapping}
+        self.names = 0
+
+    def name(self, prefix, value=None):
+        self.names += 1
+        name = prefix + str(self.names)
+        if value is not None:
+            self.namespace[name] = value
+        return name
+
+    def compile(self, jxon_type):
+        lines = ["def validate(v):"]
+        self.emit(jxon_type, "v", 1, lines)
+        lines.append("    return True")
+
+        namespace = dict(self.namespace)
+        exec("\n".join(lines), namespace)
+        return namespace["validate"]
+
+    def emit(self, jxon_type, var, depth, lines):
+        # appends statements to lines that return False unless the value in var matches jxon_type
+        if jxon_type is None:
+            return
+
+        indent = "    " * depth
+        if depth >= MAX_VALIDATOR_DEPTH and jxon_type.jxon_type in (list, dict):
+            validator = self.name("f", ValidatorCompiler().compile(jxon_type))
+            lines.append(f"{indent}if not {validator}({var}): return False")
+
+        elif jxon_type.jxon_type is ET.Element:
+            lines.append(f"{indent}if {var} is not None and type({var}) is not Element and not is_element({var}): "
+                         "return False")
+
+        elif jxon_type.jxon_type in JXONType.SIMPLE_TYPES:
+            lines.append(f"{indent}if {var} is not None and type({var}) is not {jxon_type.jxon_type.__name__}: "
+                         "return False")
+
+        elif jxon_type.jxon_type is set:
+            members = self.name("e", frozenset(jxon_type.subtype))
+            lines.append(f"{indent}if {var} is not None and {var} not in {members}: return False")
+
+        elif jxon_type.jxon_type is list:
+            lines.append(f"{indent}if {var} is not None:")
+            lines.append(f"{indent}    if type({var}) is not list: return False")
+            if jxon_type.subtype is not None:
+                element = self.name("v")
+                lines.append(f"{indent}    for {element} in {var}:")
+                self.emit(jxon_type.subtype, element, depth + 2, lines)
+
+        elif jxon_type.jxon_type is dict:
+            keys = self.name("k", frozenset(jxon_type.subtype))
+            lines.append(f"{indent}if {var} is not None:")
+            lines.append(f"{indent}    if type({var}) is not dict and not isinstance({var}, Mapping): return False")
+            lines.append(f"{indent}    if {var}.keys() != {keys}: return False")
+            for key, member_type in jxon_type.subtype.items():
+                if member_type is not None:
+                    member = self.name("v")
+                    lines.append(f"{indent}    {member} = {var}[{key!r}]")
+                    self.emit(member_type, member, depth + 1, lines)
+
+
+def parse_type(obj, sample=None, max_elements=None):
+    # Infers the type of obj in a single pass over it, merging the type of every
+    # value into the type inferred so far for its position, so that null members
+    # and elements take on the type of the first non-null value found for them.
+    #
+    # Work can be bounded on large objects: with sample, at most that many evenly
+    # spaced elements of each array are looked at, and with max_elements, no more
+    # than that many values in total. Whatever is skipped is only left untyped
+    # (null), so the result still matches everything that was looked at.
+    root = JXONType(list)
+    budget = max_elements
+    # Each frame is a container type, the path to the container, whether it is a
+    # list, and an iterator over the (index or key, value) pairs still to visit.
+    # Values are visited in document order, so the first inconsistency is reported.
+    stack = [(root, None, True, iter([(0, obj)]))]
+
+    while stack:
+        jxon_type, path, is_list, members = stack[-1]
+        for key, value in members:
+            if value is None:
+                continue
+
+            if budget is not None:
+                if budget == 0:
+                    return root.subtype
+                budget -= 1
+
+            value_type = type(value)
+            if value_type not in JXONType.SIMPLE_TYPES and value_type is not list and value_type is not dict:
+                if is_element(value):
+                    value_type = ET.Element
+                elif isinstance(value, Mapping):
+                    # records are typed like the dicts they stand for
+                    value_type = dict
+            member_type = jxon_type.subtype if is_list else jxon_type.subtype[key]
+
+            if value_type in JXONType.SIMPLE_TYPES:
+                if member_type is None:
+                    member_type = JXONType(value_type)
+                elif member_type.jxon_type is not value_type:
+                    raise inconsistency((path, key))
+                else:
+                    continue
+
+            elif value_type is list:
+                if member_type is None:
+                    member_type = JXONType(list)
+                elif member_type.jxon_type is not list:
+                    raise inconsistency((path, key))
+
+                stack.append((member_type, (path, key), True, sample_elements(value, sample)))
+
+            elif value_type is dict:
+                if member_type is None:
+                    member_type = JXONType(dict, dict.fromkeys(value))
+                elif member_type.jxon_type is not dict or member_type.subtype.keys() != value.keys():
+                    raise inconsistency((path, key))
+
+                stack.append((member_type, (path, key), False, iter(value.items())))
+
+            else:
+                raise JXONSchemaValidityException("Not parseable as JXON type: " + repr(value_type)
+                                                  + " at " + format_path((path, key)))
+
+            if is_list:
+                jxon_type.subtype = member_type
+            else:
+                jxon_type.subtype[key] = member_type
+
+            if value_type is list or value_type is dict:
+                break
+        else:
+            stack.pop()
 
-def parse_type(obj):
-    if obj is None:
-        return None
+    return root.subtype
 
-    elif type(obj) in JXONType.SIMPLE_TYPES:
-        return JXONType(type(obj))
 
-    elif type(obj) is list:
-        if len(obj) == 0:
-            return JXONType(list, None)
+def sample_elements(elements, sample):
+    length = len(elements)
+    if sample is None or length <= sample:
+        return enumerate(elements)
+    if sample <= 1:
+        return enumerate(elements[:sample])
+    # evenly spaced, always including the first and last elements
+    indices = [i * (length - 1) // (sample - 1) for i in range(sample)]
+    return iter([(i, elements[i]) for i in indices])
 
-        jxon_type = parse_type(obj[0])
-        if not all(jxon_type.is_jxon_instance(e) for e in obj):
-            raise JXONSchemaValidityException("Inconsistent list element type")
 
-        return JXONType(list, jxon_type)
+def inconsistency(path):
+    return JXONSchemaValidityException("Inconsistent list element type at " + format_path(path))
+
+
+def format_path(path):
+    # paths are linked lists of (parent path, index or key) pairs, starting with
+    # the index of the whole object in parse_type's root frame
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(key)
+    return "value" + "".join("[" + repr(key) + "]" for key in reversed(keys[:-1]))
+
 
-    elif type(obj) is dict:
-        d = {}
-        for key, value in obj.items():
-            jxon_type = parse_type(value)
-            d[key] = jxon_type
+def merge_types(t1, t2):
+    # Combines two types inferred from values that must share a schema, such as
+    # two elements of the same array; null (None) matches any type
+    if t1 is None or t1 is t2:
+        return t2
+    if t2 is None:
+        return t1
 
-        return JXONType(dict, d)
+    if t1.jxon_type is not t2.jxon_type:
+        raise JXONSchemaValidityException("Inconsistent list element type")
+
+    if t1.jxon_type is list:
+        return JXONType(list, merge_types(t1.subtype, t2.subtype))
+
+    elif t1.jxon_type is dict:
+        if set(t1.subtype.keys()) != set(t2.subtype.keys()):
+            raise JXONSchemaValidityException("Inconsistent list element type")
+        return JXONType(dict, {key: merge_types(value, t2.subtype[key]) for key, value in t1.subtype.items()})
+
+    elif t1.jxon_type is set:
+        if t1.subtype != t2.subtype:
+            raise JXONSchemaValidityException("Inconsistent list element type")
 
-    else:
-        raise JXONSchemaValidityException("Not parseable as JXON type: " + repr(type(obj)))
+    return t1
+
+
+def is_complete_type(jxon_type):
+    # whether no part of the type is left null (unknown)
+    stack = [jxon_type]
+    while stack:
+        t = stack.pop()
+        if t is None:
+            return False
+        elif t.jxon_type is list:
+            stack.append(t.subtype)
+        elif t.jxon_type is dict:
+            stack.extend(t.subtype.values())
+    return True
 
 
 def has_consistent_schema(obj):
@@ -1,4 +1,4 @@
-from .parser import SIMPLE_TYPE_KEYWORDS, Parser, LETTERS, jxon_string_escape, loads_factory, load_factory
+from .parser import SIMPLE_TYPE_KEYWORDS, Parser, LABEL_START, loads_factory, load_factory
 from .jxontype import JXONType, parse_type, has_consistent_schema
 from . import jxon
 
@@ -11,40 +11,35 @@ class JXSDParser(Parser):
     exception_class = JXSDParseException
     permit_type_annotation = False
     native_extension = ".jxsd"
+    single_element_arrays = True
+    lazy_containers = False
 
     def grab_value(self):
-        if self.next() == "{":
-            d = self.grab_object()
-            return JXONType(dict, d)
-        elif self.next() == "[":
-            return self.grab_array()
-        elif self.next(4) == "Enum":
+        if self.text.startswith("Enum", self.pos):
             return self.grab_enum()
 
-        elif self.next() in LETTERS | {'_'}:
+        elif self.next() in LABEL_START:
             return self.resolve_variable()
 
         self.throw_exception("Unknown expression type")
 
-    def grab_array(self):
-        self.expect('[')
-        jxon_type = self.grab_element()
-        self.expect(']')
-        return JXONType(list, subtype=jxon_type)
+    def make_array(self, elements):
+        return JXONType(list, subtype=elements[0])
+
+    def make_object(self, members):
+        return JXONType(dict, members)
 
     def grab_enum(self):
         self.expect("Enum")
         self.expect('(')
 
         jxon_parser = jxon.JXONParser('')
-        jxon_parser.lines = self.lines
-        jxon_parser.line_no = self.line_no
-        jxon_parser.col_no = self.col_no
+        jxon_parser.text = self.text
+        jxon_parser.pos = self.pos
 
         els = jxon_parser.grab_elements()
 
-        self.line_no = jxon_parser.line_no
-        self.col_no = jxon_parser.col_no
+        self.pos = jxon_parser.pos
 
         if type(els[0]) not in JXONType.SIMPLE_TYPES:
             self.throw_exception("Enum members can only be primitive types")
@@ -72,39 +67,13 @@ def dumps_helper(jxon_type: JXONType, indent, sort_keys, indent_level):
             return key
 
     if jxon_type.jxon_type is list:
-        return "[%s]" % dumps_helper(jxon_type.subtype, indent=indent, sort_keys=sort_keys, indent_level=indent_level)
+        return "".join(iterencode_helper(jxon_type, indent=indent, sort_keys=sort_keys, indent_level=indent_level))
 
     elif jxon_type.jxon_type is dict:
-        s = '{'
-        if indent is not None:
-            s += '\n'
-
-        items = list(jxon_type.subtype.items())
-        if len(items) == 0:
+        if len(jxon_type.subtype) == 0:
             return '{}'
-        if sort_keys:
-            items = sorted(items, key=lambda x: x[0])
-        for key, value in items:
-            if indent is not None:
-                s += ' ' * (indent * (indent_level+1))
-
-            s += '"' + jxon_string_escape(key) + '"'
-            s += ': '
-            s += dumps_helper(value, indent=indent, sort_keys=sort_keys, indent_level=indent_level+1)
-            s += ','
-
-            if indent is not None:
-                s += '\n'
-            else:
-                s += ' '
 
-        s = s[:-2]
-        if indent is not None:
-            s += '\n' + ' ' * (indent * indent_level)
-
-        s += '}'
-
-        return s
+        return "".join(iterencode_helper(jxon_type, indent=indent, sort_keys=sort_keys, indent_level=indent_level))
 
     elif jxon_type.jxon_type is set:
         l = list(jxon_type.subtype)
@@ -118,12 +87,42 @@ def dumps_helper(jxon_type: JXONType, indent, sort_keys, indent_level):
         raise ValueError("??")
 
 
-def dumps(jxon_type, indent=None, sort_keys=False):
+def type_chunks(jxon_type, indent, sort_keys, indent_level, encode):
+    # Yields the encoding of an array or non-empty object type in the form
+    # expected by jxon.iter_chunks
+    if jxon_type.jxon_type is list:
+        encoded = encode(jxon_type.subtype, indent_level)
+        if type(encoded) is str:
+            yield '[' + encoded + ']'
+        else:
+            yield '['
+            yield encoded
+            yield ']'
+        return
+
+    yield from jxon.container_chunks(jxon_type.subtype, indent=indent, sort_keys=sort_keys,
+                                     indent_level=indent_level, encode=encode)
+
+
+def iterencode_helper(jxon_type, indent, sort_keys, indent_level):
+    def encode(value, level):
+        if value is not None and (value.jxon_type is list or (value.jxon_type is dict and len(value.subtype) > 0)):
+            return type_chunks(value, indent=indent, sort_keys=sort_keys, indent_level=level, encode=encode)
+        return dumps_helper(value, indent=indent, sort_keys=sort_keys, indent_level=level)
+
+    return jxon.iter_chunks(encode(jxon_type, indent_level))
+
+
+def iterencode(jxon_type, indent=None, sort_keys=False):
     if type(jxon_type) is not JXONType:
         raise JXSDEncodeException("Cannot dump something other than a JXONType object")
 
-    return dumps_helper(jxon_type, indent=indent, sort_keys=sort_keys, indent_level=0)
+    return iterencode_helper(jxon_type, indent=indent, sort_keys=sort_keys, indent_level=0)
+
+
+def dumps(jxon_type, indent=None, sort_keys=False):
+    return "".join(iterencode(jxon_type, indent=indent, sort_keys=sort_keys))
 
 
 def dump(jxon_type, fp, indent=None, sort_keys=False):
-    fp.write(dumps(jxon_type, indent=indent, sort_keys=sort_keys))
\ No newline at end of file
+    jxon.write_chunks(iterencode(jxon_type, indent=indent, sort_keys=sort_keys), fp)
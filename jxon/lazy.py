@@ -0,0 +1,175 @@
+from collections.abc import Mapping, Sequence
+
+
+class LazySource:
+    # What the proxies of one document need to parse their part of it: the
+    # buffer of the whole document, so that errors point at the right line, and
+    # the module its variables are looked up in
+
+    def __init__(self, parser_class, text, curr_dir, module, interner=None, xml_backend=None, lazy_xml=False):
+        self.parser_class = parser_class
+        self.text = text
+        self.curr_dir = curr_dir
+        self.module = module
+        self.interner = interner
+        self.xml_backend = xml_backend
+        self.lazy_xml = lazy_xml
+
+    def parser(self):
+        parser = self.parser_class("", self.curr_dir)
+        parser.text = self.text
+        parser.json_budget = len(self.text) if parser.json_fast_path else 0
+        parser.module = self.module
+        parser.use_interner(self.interner)
+        if self.xml_backend is not None:
+            parser.xml_backend = self.xml_backend
+        parser.lazy_xml = self.lazy_xml
+        parser.source = self
+        return parser
+
+
+class LazyContainer:
+    """
+    An array or object that has only been skipped over in the source, and is
+    parsed from it the first time one of its members is looked up. Arrays and
+    objects among its members are proxies in turn, so that looking up one
+    deeply nested value only parses the containers on the way to it. Syntax
+    errors inside a container are raised when it is parsed, pointing into the
+    source as usual.
+
+    Proxies are read-only. materialize() parses the whole container into plain
+    lists and dicts.
+    """
+
+    __slots__ = ("_source", "_start", "_end", "_is_json", "_members")
+
+    def __init__(self, source, start, end):
+        self._source = source
+        self._start = start
+        self._end = end
+        # whether the container is plain JSON, and so can be copied as it is;
+        # None until it is first asked
+        self._is_json = None
+        self._members = None
+
+    def members(self):
+        # the list or dict of the container's members, parsed one level deep
+        if self._members is None:
+            self._members = self._source.parser().grab_lazy_members(self._source, self._start)
+        return self._members
+
+    def set_members(self, members):
+        self._members = members
+
+    def materialize(self):
+        parser = self._source.parser()
+        parser.jump(self._start)
+        return parser.grab_element()
+
+    def verbatim(self):
+        # the container's text in the source if it can be copied into an encoding
+        # as it is, which is when the JSON fast path can parse all of it, or None
+        if self._is_json is None:
+            parser = self._source.parser()
+            parser.jump(self._start)
+            self._is_json = parser.grab_json_container() is not None and parser.pos == self._end
+        return self._source.text[self._start:self._end] if self._is_json else None
+
+    def __len__(self):
+        return len(self.members())
+
+    def __getitem__(self, key):
+        return self.members()[key]
+
+    def __iter__(self):
+        return iter(self.members())
+
+    def __repr__(self):
+        return type(self).__name__ + "(" + repr(self.members()) + ")"
+
+
+class LazyList(LazyContainer, Sequence):
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, LazyList)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+
+class LazyDict(LazyContainer, Mapping):
+    __slots__ = ()
+
+    def __contains__(self, key):
+        return key in self.members()
+
+    def keys(self):
+        return self.members().keys()
+
+    def items(self):
+        return self.members().items()
+
+    def values(self):
+        return self.members().values()
+
+
+def lazy_container(source, start, end):
+    cls = LazyList if source.text[start] == '[' else LazyDict
+    return cls(source, start, end)
+
+
+class LazyElement:
+    """
+    An XML element that has only been checked to be well-formed, and is built
+    from its text in the source the first time anything about it is looked up:
+    its tag, text, tail, attributes or children. Until then, encoding it writes
+    its source text as it is.
+
+    Once built, it stands in for the built element, which may be changed
+    through it like any other. element() returns the built element itself.
+    """
+
+    __slots__ = ("_source", "_start", "_end", "_element")
+
+    def __init__(self, source, start, end):
+        self._source = source
+        self._start = start
+        self._end = end
+        self._element = None
+
+    def element(self):
+        if self._element is None:
+            parser = self._source.parser()
+            parser.lazy_xml = False
+            parser.jump(self._start)
+            self._element = parser.grab_xml()
+        return self._element
+
+    def verbatim(self):
+        # the element's text in the source if it hasn't been built yet, or None
+        return self._source.text[self._start:self._end] if self._element is None else None
+
+    def __getattr__(self, name):
+        return getattr(self.element(), name)
+
+    def __setattr__(self, name, value):
+        if name in LazyElement.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.element(), name, value)
+
+    def __len__(self):
+        return len(self.element())
+
+    def __getitem__(self, index):
+        return self.element()[index]
+
+    def __iter__(self):
+        return iter(self.element())
+
+    def __repr__(self):
+        if self._element is None:
+            return type(self).__name__ + "(" + repr(self.verbatim()) + ")"
+        return type(self).__name__ + "(" + repr(self._element) + ")"
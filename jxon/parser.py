@@ -1,10 +1,39 @@
+import json
 import os
+import re
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from xml.etree import ElementTree as ET
 
-from .jxontype import JXONType
+from .cache import module_cache, disk_cache, content_digest
+from .jxontype import JXONType, JXONSchemaValidityException, parse_type, merge_types, is_complete_type
+from .records import to_records
+from .lazy import LazySource, lazy_container
+from .interning import make_interner
+from .xmlbackends import ETREE_BACKEND, make_xml_backend
 
 DIGITS = set("0123456789")
 LETTERS = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+LABEL_START = LETTERS | {'_'}
+INLINE_WHITESPACE = {' ', '\t', '\r'}
+# streams are read this many characters at a time
+CHUNK_SIZE = 1 << 16
+# no token needs to see further ahead than this to know where it ends
+LOOKAHEAD = 16
+
+JSON_CONTAINER_START = {'[', '{'}
+NUL = chr(0)
+
+WHITESPACE_RUN = re.compile(r'(?:[ \t\r\n]+|//[^\n]*|/\*.*?\*/)*', re.DOTALL)
+LABEL_RUN = re.compile(r'[A-Za-z0-9_]*')
+DIGIT_RUN = re.compile(r'[0-9]*')
+STRING_RUN = re.compile(r'[^"\\\n]*')
+# a file imported inline, wherever it is in the text
+INLINE_IMPORT = re.compile(r'\bimport\s*\(\s*"([^"\\\n]*)"\s*\)')
+HEX_RUN = re.compile(r'[0-9a-fA-F]{4}')
+# the characters that may begin or end a nesting level, or hide brackets
+STRUCTURE_CHAR = re.compile(r'[\[\]{}"</]')
 
 SINGLE_CHAR_ESCAPES = {
     '"': '"',
@@ -17,11 +46,66 @@ SINGLE_CHAR_ESCAPES = {
     't': '\t'
 }
 
+# the files currently being imported by this thread, outermost first, the
+# module cache imports are loaded through, if it is overridden for this thread,
+# and the ParseStats of the load this thread is doing, if any
+IMPORTING = threading.local()
+
+
+def import_stack():
+    if not hasattr(IMPORTING, "stack"):
+        IMPORTING.stack = []
+    return IMPORTING.stack
+
+
+def import_cache(default):
+    cache = getattr(IMPORTING, "cache", None)
+    return default if cache is None else cache
+
+
+def import_stats():
+    return getattr(IMPORTING, "stats", None)
+
 
 class VariableResolutionException(BaseException):
     pass
 
 
+class JSONFastPathException(BaseException):
+    # Raised by the JSON decoder hooks below when a container is valid JSON but
+    # not valid JXON, so that the regular parser can report the error
+    pass
+
+
+def json_object_pairs(pairs):
+    d = dict(pairs)
+    if len(d) != len(pairs):
+        raise JSONFastPathException("Repeat key")
+    return d
+
+
+def json_float(s):
+    exponent = max(s.find('e'), s.find('E'))
+    if exponent != -1 and s[exponent+1] not in '+-':
+        raise JSONFastPathException("Exponent must be followed by sign")
+    return float(s)
+
+
+def json_constant(s):
+    raise JSONFastPathException("Not a JXON value: " + s)
+
+
+def make_json_decoder(object_pairs_hook=json_object_pairs):
+    return json.JSONDecoder(
+        object_pairs_hook=object_pairs_hook,
+        parse_float=json_float,
+        parse_constant=json_constant
+    )
+
+
+JSON_DECODER = make_json_decoder()
+
+
 SIMPLE_TYPE_KEYWORDS = {
     "Integer": JXONType(int),
     "Float": JXONType(float),
@@ -31,10 +115,28 @@ SIMPLE_TYPE_KEYWORDS = {
 }
 
 
+def describe_type(jxon_type):
+    if jxon_type.jxon_type is list:
+        return "array"
+    elif jxon_type.jxon_type is dict:
+        return "object"
+    elif jxon_type.jxon_type is set:
+        return "one of " + ", ".join(sorted(repr(e) for e in jxon_type.subtype))
+
+    for label, simple_type in SIMPLE_TYPE_KEYWORDS.items():
+        if simple_type.jxon_type is jxon_type.jxon_type:
+            return label
+
+
 class Module:
     def __init__(self):
         self.default_export = None
         self.exports = {}
+        # the file this module was parsed from and the hash of its contents, if any
+        self.path = None
+        self.digest = None
+        # maps the path of every file imported, directly or indirectly, to its hash
+        self.dependencies = {}
         for label, jxon_type in SIMPLE_TYPE_KEYWORDS.items():
             self.set(label, jxon_type)
 
@@ -63,155 +165,202 @@ class Parser:
     permit_type_annotation = None
     native_extension = None
     subparser_classes = {}
+    single_element_arrays = False
+    json_fast_path = False
+    # whether the default export may be parsed lazily
+    lazy_containers = True
+    # imports are looked up in this cache of parsed modules; None disables it
+    module_cache = module_cache
 
     def __init__(self, s, curr_dir=None):
-        self.lines = s.split("\n")
-        self.line_no = 0
-        self.col_no = 0
+        # The whole input is kept as one flat buffer, and the cursor is a single
+        # integer offset into it. The trailing newline terminates the last line, so
+        # every line (including the last) ends in a '\n', and the parser is at EOF
+        # once the offset has moved past it.
+        self.text = s + "\n"
+        self.pos = 0
         self.curr_dir = curr_dir
+        # number of characters the JSON fast path may scan in failed attempts
+        # before it is given up on for the rest of the parse
+        self.json_budget = len(self.text) if self.json_fast_path else 0
+        # when reading incrementally from a stream, text only holds a window of
+        # the input; these record where that window starts
+        self.stream = None
+        self.chunk_size = CHUNK_SIZE
+        self.line_offset = 0
+        self.col_offset = 0
+        # the number of bytes of the stream dropped from the window, if counted
+        self.stream_bytes = None
+        self.byte_mark = None
         self.module = Module()
+        # the type the default export is checked against while it is parsed, if any
+        self.schema = None
+        self.validators = {}
+        # whether to return the default export as a proxy that parses on access
+        self.lazy = False
+        # the table strings are shared through, if any
+        self.interner = None
+        # what XML elements are built as
+        self.xml_backend = ETREE_BACKEND
+        # whether XML elements are only checked and kept as lazy values
+        self.lazy_xml = False
+        # what lazy values refer back to the buffer through, once one is made
+        self.source = None
+        self.json_decoder = JSON_DECODER
+        # what the parse is timed into, which parsers of imported files share
+        self.stats = import_stats()
 
     def next(self, n=1, permit_eol=True):
-        if self.eof():
+        pos = self.pos
+        text = self.text
+        if pos >= len(text):
             if permit_eol:
-                return chr(0)
+                return NUL
             else:
                 raise self.exception_class("EOF while parsing JXON")
-        elif self.eol():
+        elif text[pos] == "\n":
             if permit_eol:
-                return chr(0)
+                return NUL
             else:
                 self.throw_exception("Unexpected EOL")
 
-        return self.lines[self.line_no][self.col_no: self.col_no+n]
+        if n == 1:
+            return text[pos]
 
-    def advance(self, n=1):
-        if self.eof():
-            return
-        if self.eol():
-            self.col_no = 0
-            self.line_no += 1
-        else:
-            self.col_no += 1
+        s = text[pos:pos+n]
+        lb = s.find("\n")
+        return s if lb == -1 else s[:lb]
 
-        if n > 1:
-            self.advance(n-1)
+    def advance(self, n=1):
+        self.pos = min(self.pos + n, len(self.text))
 
     def eol(self):
-        return self.col_no >= len(self.lines[self.line_no])
+        return self.pos >= len(self.text) or self.text[self.pos] == "\n"
 
     def eof(self):
-        return self.line_no >= len(self.lines)
+        return self.pos >= len(self.text)
 
     def breakpoint(self):
-        return self.line_no, self.col_no
+        return self.pos
 
     def jump(self, bp):
-        self.line_no, self.col_no = bp
+        self.pos = bp
+
+    def line_bounds(self):
+        pos = self.pos
+        if self.eof():
+            # errors at EOF point at the last character of the last line
+            pos = len(self.text) - 1
+
+        start = self.text.rfind("\n", 0, pos) + 1
+        end = self.text.find("\n", pos)
+        if end == -1:
+            end = len(self.text)
+        return start, end
+
+    def position(self):
+        start, _ = self.line_bounds()
+        line_no = self.line_offset + self.text.count("\n", 0, start)
+        if self.eof():
+            col_no = len(self.text) - start - 2
+        else:
+            col_no = self.pos - start
+        if start == 0:
+            col_no += self.col_offset
+        return line_no, col_no
 
     def throw_exception(self, message, bp=None):
-        if bp:
+        if bp is not None:
             self.jump(bp)
 
-        if self.eof():
-            self.line_no = len(self.lines) - 1
-            self.col_no = len(self.lines[-1]) - 1
+        line_no, col_no = self.position()
+        start, end = self.line_bounds()
+        line = self.text[start:end]
+        caret_col = col_no - (self.col_offset if start == 0 else 0)
 
-        message = ("(line %s, col %s) " % (self.line_no+1, self.col_no+1)) +\
-                  message + "\n" + self.lines[self.line_no] + "\n" + " "*self.col_no + "^"
+        message = ("(line %s, col %s) " % (line_no+1, col_no+1)) +\
+                  message + "\n" + line + "\n" + " "*caret_col + "^"
         raise self.exception_class(message)
 
     def expect(self, s):
-        if self.next(len(s)) == s:
-            self.advance(len(s))
+        if self.text.startswith(s, self.pos):
+            self.pos += len(s)
         else:
             self.throw_exception("Expected " + repr(s))
 
     def expect_whitespace(self):
-        if not self.eol() and self.next() not in {' ', '\t', '\r'}:
+        if not self.eol() and self.next() not in INLINE_WHITESPACE:
             self.throw_exception("Expected whitespace")
 
         self.pass_whitespace()
 
     def pass_whitespace(self):
-        if self.next(2) == "//":
-            self.pass_line_comment()
-            self.pass_whitespace()
-        elif self.next(2) == "/*":
+        self.pos = WHITESPACE_RUN.match(self.text, self.pos).end()
+        if self.text.startswith("/*", self.pos):
+            # only an unterminated comment is left unmatched
             self.pass_multiline_comment()
-            self.pass_whitespace()
-        elif self.eof():
-            return
-        elif self.eol() or self.next() in {' ', '\t', '\r'}:
-            self.advance()
-            self.pass_whitespace()
-
-    def pass_line_comment(self):
-        self.expect("//")
-        while not self.eol():
-            self.advance()
 
     def pass_multiline_comment(self):
         self.expect("/*")
-        while self.next(2) != "*/":
-            self.advance()
-        self.advance(2)
+        end = self.text.find("*/", self.pos)
+        if end == -1:
+            self.jump(len(self.text))
+            self.throw_exception("Expected '*/'")
+        self.pos = end + 2
+
+    def use_interner(self, interner):
+        self.interner = interner
+        if interner is None:
+            self.json_decoder = JSON_DECODER
+        else:
+            self.json_decoder = make_json_decoder(interner.object_pairs)
 
     def parse(self):
         module = self.parse_as_module()
         return module.default_export
 
     def parse_as_module(self):
+        span = self.start_span("imports")
         self.pass_whitespace()
         self.read_imports()
+        span = self.next_span(span, "variables")
         self.read_variables()
+        span = self.next_span(span, "default export")
         if not self.eof() and self.next(6) != "export":
-            self.module.default_export = self.grab_element()
+            if self.lazy and self.lazy_containers:
+                self.module.default_export = self.grab_lazy_element(self.lazy_source(), decode=True)
+            else:
+                self.module.default_export = self.grab_element(self.schema)
+        span = self.next_span(span, "exports")
         if not self.eof():
             self.read_exports()
+        self.end_span(span)
         return self.module
 
-    def read_imports(self):
-        while self.next(6) == "import":
-            self.advance(6)
-            self.expect(' ')
-            self.pass_whitespace()
+    def start_span(self, name, path=None):
+        # starts timing a part of the parse from the cursor on, if it is being timed
+        if self.stats is None:
+            return None
+        return self.stats.start(name, path, self.pos)
 
-            defaultExportLabel = None
-            moduleLabel = None
-            moduleImports = None
+    def end_span(self, span):
+        # the newline added to the end of the text isn't counted as part of it
+        if span is not None:
+            self.stats.end(span, self.text[span.offset:min(self.pos, len(self.text) - 1)])
 
-            if self.next() in LETTERS | {'_'}:
-                defaultExportLabel = self.grab_label()
-                self.pass_whitespace()
+    def next_span(self, span, name):
+        self.end_span(span)
+        return self.start_span(name)
 
-            if defaultExportLabel is None or self.next() == ',':
-                if self.next() == ',':
-                    self.advance()
-                    self.pass_whitespace()
+    def lazy_source(self):
+        if self.source is None:
+            self.source = LazySource(type(self), self.text, self.curr_dir, self.module, self.interner,
+                                     self.xml_backend, self.lazy_xml)
+        return self.source
 
-                if self.next() == '*':
-                    self.advance()
-                    self.expect_whitespace()
-                    self.expect('as')
-                    self.expect_whitespace()
-                    moduleLabel = self.grab_label()
-                    if moduleLabel == '':
-                        self.throw_exception("Must specify a name to give module")
-                else:
-                    self.expect('{')
-                    self.pass_whitespace()
-                    moduleImports = self.grab_labels()
-                    # TODO: support for import {foo as bar} from "example.jxon"
-                    self.pass_whitespace()
-                    self.expect('}')
-
-                self.pass_whitespace()
-
-            self.expect('from')
-            self.expect_whitespace()
-
-            filepath = self.grab_string()
+    def read_imports(self):
+        while self.next(6) == "import":
+            defaultExportLabel, moduleLabel, moduleImports, filepath = self.grab_import()
             submodule = self.load_submodule(filepath)
 
             if defaultExportLabel:
@@ -231,20 +380,137 @@ class Parser:
             self.expect(';')
             self.expect_whitespace()
 
-    def load_submodule(self, filepath):
-        _, extension = os.path.splitext(filepath)
+    def scan_imports(self):
+        # Reads only the import section, returning the files it imports along with
+        # the parser class for each, without loading any of them
+        imports = []
+        self.pass_whitespace()
+        while self.next(6) == "import":
+            filepath = self.grab_import()[3]
+            _, extension = os.path.splitext(filepath)
+            imports.append((self.resolve_import_path(filepath), self.resolve_subparser_class(extension)))
+            self.expect(';')
+            self.expect_whitespace()
+        return imports
+
+    def scan_inline_imports(self):
+        # The files that the rest of the text may import inline, along with the
+        # parser class for each. The text isn't parsed, so anything that looks like
+        # an inline import counts, even inside a string or a comment.
+        imports = []
+        for match in INLINE_IMPORT.finditer(self.text, self.pos):
+            filepath = match.group(1)
+            _, extension = os.path.splitext(filepath)
+            if extension == self.native_extension:
+                imports.append((self.resolve_import_path(filepath), type(self)))
+            elif extension in self.subparser_classes:
+                imports.append((self.resolve_import_path(filepath), self.subparser_classes[extension]))
+        return imports
+
+    def grab_import(self):
+        self.advance(6)
+        self.expect(' ')
+        self.pass_whitespace()
 
+        defaultExportLabel = None
+        moduleLabel = None
+        moduleImports = None
+
+        if self.next() in LABEL_START:
+            defaultExportLabel = self.grab_label()
+            self.pass_whitespace()
+
+        if defaultExportLabel is None or self.next() == ',':
+            if self.next() == ',':
+                self.advance()
+                self.pass_whitespace()
+
+            if self.next() == '*':
+                self.advance()
+                self.expect_whitespace()
+                self.expect('as')
+                self.expect_whitespace()
+                moduleLabel = self.grab_label()
+                if moduleLabel == '':
+                    self.throw_exception("Must specify a name to give module")
+            else:
+                self.expect('{')
+                self.pass_whitespace()
+                moduleImports = self.grab_labels()
+                # TODO: support for import {foo as bar} from "example.jxon"
+                self.pass_whitespace()
+                self.expect('}')
+
+            self.pass_whitespace()
+
+        self.expect('from')
+        self.expect_whitespace()
+
+        filepath = self.grab_string()
+        return defaultExportLabel, moduleLabel, moduleImports, filepath
+
+    def resolve_import_path(self, filepath):
         if filepath.startswith('./'):
             filepath = os.path.join(self.curr_dir, filepath[2:])
+        return os.path.abspath(filepath)
 
-        with open(filepath, 'r') as fh:
-            s = fh.read()
-
+    def load_submodule(self, filepath):
+        _, extension = os.path.splitext(filepath)
         subparser_class = self.resolve_subparser_class(extension)
-        subparser = subparser_class(s, os.path.dirname(filepath))
-        submodule = subparser.parse_as_module()
+        filepath = self.resolve_import_path(filepath)
+
+        importing = import_stack()
+        if filepath in importing:
+            self.throw_exception("Import cycle: " + " -> ".join(importing[importing.index(filepath):] + [filepath]))
+
+        cache = import_cache(self.module_cache)
+        importing.append(filepath)
+        span = None if self.stats is None else self.stats.start("file", filepath)
+        try:
+            if not self.default_options():
+                submodule = self.parse_submodule(filepath, subparser_class, cache)
+            elif cache is not None:
+                submodule = cache.load(filepath, subparser_class)
+            else:
+                with open(filepath, 'r') as fh:
+                    s = fh.read()
+                submodule = disk_cache.parse(s, filepath, subparser_class)
+        finally:
+            importing.pop()
+            if span is not None:
+                # a file found in a cache wasn't parsed, and so has no phases
+                span.cached = not span.children
+                self.stats.end(span)
+
+        self.module.dependencies[submodule.path] = submodule.digest
+        self.module.dependencies.update(submodule.dependencies)
         return submodule
 
+    def default_options(self):
+        # whether imported files may be parsed as they are for the caches: with
+        # ElementTree elements, built right away, and strings not interned
+        return self.xml_backend is ETREE_BACKEND and not self.lazy_xml and self.interner is None
+
+    def parse_submodule(self, filepath, parser_class, cache):
+        # Parses an imported file with the options of this parse. The caches only
+        # hold modules parsed with the default options, so they are bypassed, but
+        # the file is still read through the module cache if there is one, which
+        # may not read it from disk.
+        if cache is not None:
+            s = cache.read_source(filepath)
+        else:
+            with open(filepath, 'r') as fh:
+                s = fh.read()
+
+        parser = parser_class(s, os.path.dirname(filepath))
+        parser.use_interner(self.interner)
+        parser.xml_backend = self.xml_backend
+        parser.lazy_xml = self.lazy_xml
+        module = parser.parse_as_module()
+        module.path = filepath
+        module.digest = content_digest(s)
+        return module
+
     def resolve_subparser_class(self, extension):
         if extension == self.native_extension:
             return type(self)
@@ -254,7 +520,7 @@ class Parser:
             self.throw_exception("Unknown file extension: " + extension)
 
     def read_variables(self):
-        while not self.eof() and self.next() in LETTERS | {'_'}:
+        while not self.eof() and self.next() in LABEL_START:
             bp = self.breakpoint()
             label = self.grab_label()
             if label == "export":
@@ -311,9 +577,12 @@ class Parser:
             if self.next(7) == "default":
                 self.advance(7)
                 self.expect_whitespace()
+                bp = self.breakpoint()
                 default_export = self.resolve_variable()
+                if self.schema is not None and not self.matches_type(default_export, self.schema):
+                    self.throw_exception("Default export does not match schema", bp)
 
-            elif self.next() in LETTERS | {'_'}:
+            elif self.next() in LABEL_START:
                 label = self.grab_label()
                 exports[label] = self.module.resolve_variable_chain([label])
 
@@ -333,62 +602,275 @@ class Parser:
         if exports != {}:
             self.module.exports = exports
 
-    def grab_element(self):
-        self.pass_whitespace()
-        e = self.grab_value()
+    def grab_element(self, jxon_type=None):
+        # Arrays and objects are parsed with an explicit stack of open containers
+        # rather than by recursion, so neither the length nor the nesting depth of
+        # a document is limited by Python's recursion limit. Each frame is a
+        # [container, key, container type] triple; key is only used by objects.
+        #
+        # If a type is given, every value is checked against it as soon as it is
+        # read, with expected holding the type of the value about to be read.
+        stack = []
+        expected = jxon_type
+        while True:
+            self.pass_whitespace()
+            c = self.next()
+            bp = self.breakpoint()
+            value = self.grab_json_container() if c in JSON_CONTAINER_START else None
+
+            if value is not None:
+                if expected is not None and not self.matches_type(value, expected):
+                    # reparse the container to find where exactly it goes wrong
+                    self.jump(bp)
+                    value = None
+
+            if value is None:
+                if c == '[':
+                    self.check_container_type(expected, list)
+                    self.advance()
+                    self.pass_whitespace()
+                    if self.single_element_arrays or self.next() != ']':
+                        stack.append([[], None, expected])
+                        expected = None if expected is None else expected.subtype
+                        continue
+                    self.advance()
+                    value = self.make_array([])
+
+                elif c == '{':
+                    self.check_container_type(expected, dict)
+                    self.advance()
+                    self.pass_whitespace()
+                    if self.next() != '}':
+                        frame = [{}, None, expected]
+                        stack.append(frame)
+                        if expected is None:
+                            frame[1] = self.grab_member_key()
+                        else:
+                            expected = self.grab_schema_member_key(frame)
+                        continue
+                    self.check_missing_keys({}, expected)
+                    self.advance()
+                    value = self.make_object({})
+
+                else:
+                    value = self.grab_value()
+                    if expected is not None and not self.matches_type(value, expected):
+                        self.throw_exception("Expected " + describe_type(expected), bp)
+
+            self.pass_whitespace()
+            while stack:
+                frame = stack[-1]
+                container, key, container_type = frame
+
+                if type(container) is list:
+                    container.append(value)
+                    if not self.single_element_arrays and self.next() == ',':
+                        self.advance()
+                        expected = None if container_type is None else container_type.subtype
+                        break
+                    self.expect(']')
+                    value = self.make_array(container)
+
+                else:
+                    if key in container:
+                        self.throw_exception("Repeat key: " + repr(key))
+                    container[key] = value
+                    if self.next() == ',':
+                        self.advance()
+                        if container_type is None:
+                            frame[1] = self.grab_member_key()
+                            expected = None
+                        else:
+                            expected = self.grab_schema_member_key(frame)
+                        break
+                    if self.next() == '}':
+                        self.check_missing_keys(container, container_type)
+                    self.expect('}')
+                    value = self.make_object(container)
+
+                stack.pop()
+                self.pass_whitespace()
+
+            else:
+                return value
+
+    def grab_schema_member_key(self, frame):
+        # Reads the next member key of the object in frame, returning the type its
+        # value should have
         self.pass_whitespace()
-        return e
+        bp = self.breakpoint()
+        frame[1] = self.grab_member_key()
+        object_type = frame[2]
+        if frame[1] not in object_type.subtype:
+            self.throw_exception("Unexpected key: " + repr(frame[1]), bp)
+        return object_type.subtype[frame[1]]
+
+    def check_container_type(self, expected, container_type):
+        if expected is not None and expected.jxon_type is not container_type:
+            self.throw_exception("Expected " + describe_type(expected))
+
+    def check_missing_keys(self, members, object_type):
+        if object_type is None or len(members) == len(object_type.subtype):
+            return
 
-    def grab_elements(self):
-        e = self.grab_element()
+        for key in object_type.subtype:
+            if key not in members:
+                self.throw_exception("Missing key: " + repr(key))
+
+    def matches_type(self, value, jxon_type):
+        if jxon_type.jxon_type is list or jxon_type.jxon_type is dict:
+            # containers are checked with validators compiled once per type
+            validator = self.validators.get(id(jxon_type))
+            if validator is None:
+                validator = self.validators[id(jxon_type)] = jxon_type.compile()
+            return validator(value)
+
+        return jxon_type.is_jxon_instance(value)
+
+    def grab_json_container(self):
+        # Tries to decode the array or object at the cursor with the C-accelerated
+        # stdlib JSON scanner. Returns None when the container uses any JXON-only
+        # syntax (comments, XML, variables, multiline strings...), in which case the
+        # caller falls back to the regular parser, which also produces positioned
+        # error messages.
+        if self.json_budget <= 0:
+            return None
+
+        try:
+            # raw_decode would turn a StopIteration into a JSONDecodeError, which
+            # counts the lines of the whole text up to where it stopped
+            value, end = self.json_decoder.scan_once(self.text, self.pos)
+        except StopIteration as e:
+            self.json_budget -= e.value - self.pos
+            return None
+        except json.JSONDecodeError as e:
+            # the error counted the lines of the text up to where it was raised,
+            # which is charged as scanned too, so that failures far into a long
+            # document can't add up to quadratic time
+            self.json_budget -= 2 * e.pos - self.pos
+            return None
+        except (JSONFastPathException, ValueError, RecursionError):
+            self.json_budget = 0
+            return None
+
+        self.pos = end
+        return value
+
+    def grab_lazy_element(self, source, decode=False):
+        # Like grab_element, except that arrays and objects are returned as proxies
+        # that parse them when first accessed. Finding the end of a container
+        # means going through it anyway, so with decode set, its members are
+        # parsed (one level deep) on the way.
+        self.pass_whitespace()
+        if self.next() not in JSON_CONTAINER_START:
+            return self.grab_value()
 
-        if self.next() == ',':
-            self.advance()
-            elements = self.grab_elements()
+        start = self.pos
+        if decode:
+            members = self.grab_lazy_members(source, start)
         else:
+            self.skip_container()
+        container = lazy_container(source, start, self.pos)
+        if decode:
+            container.set_members(members)
+        return container
+
+    def grab_lazy_members(self, source, start):
+        # Parses the members of the array or object at start, leaving any arrays
+        # and objects among them as proxies
+        self.jump(start)
+        if self.next() == '[':
+            self.advance()
+            self.pass_whitespace()
             elements = []
+            if self.single_element_arrays or self.next() != ']':
+                while True:
+                    elements.append(self.grab_lazy_element(source))
+                    self.pass_whitespace()
+                    if self.single_element_arrays or self.next() != ',':
+                        break
+                    self.advance()
+            self.expect(']')
+            return self.make_array(elements)
 
-        return [e] + elements
-
-    def grab_value(self):
-        raise NotImplementedError()
+        self.expect('{')
+        self.pass_whitespace()
+        members = {}
+        if self.next() != '}':
+            while True:
+                key = self.grab_member_key()
+                if key in members:
+                    self.throw_exception("Repeat key: " + repr(key))
+                members[key] = self.grab_lazy_element(source)
+                self.pass_whitespace()
+                if self.next() != ',':
+                    break
+                self.advance()
+        self.expect('}')
+        return self.make_object(members)
+
+    def skip_container(self):
+        # Moves the cursor past the array or object at the cursor without keeping
+        # it. Unless the JSON fast path can take it, only brackets are counted,
+        # along with whatever may hide them: strings, comments and XML elements
+        # (which are parsed and dropped). Other syntax errors are left for when
+        # the container is parsed.
+        if self.grab_json_container() is not None:
+            return
 
-    def grab_object(self):
-        self.expect("{")
+        text = self.text
+        depth = 0
+        while True:
+            m = STRUCTURE_CHAR.search(text, self.pos)
+            if m is None:
+                self.jump(len(text))
+                self.throw_exception("Expected ']' or '}'")
+
+            self.pos = m.start()
+            c = m.group()
+            if c == '[' or c == '{':
+                depth += 1
+                self.advance()
+            elif c == ']' or c == '}':
+                depth -= 1
+                self.advance()
+                if depth == 0:
+                    return
+            elif c == '"':
+                self.grab_string(allow_lb=True)
+            elif c == '<':
+                self.grab_value()
+            elif text.startswith("//", self.pos) or text.startswith("/*", self.pos):
+                self.pass_whitespace()
+            else:
+                self.advance()
 
-        self.pass_whitespace()
-        if self.next() == "}":
+    def grab_elements(self):
+        elements = [self.grab_element()]
+        while self.next() == ',':
             self.advance()
-            return {}
+            elements.append(self.grab_element())
+        return elements
 
-        d = self.grab_members({})
+    def grab_value(self):
+        # Parses any value other than an array or object, which are handled by
+        # grab_element
+        raise NotImplementedError()
 
-        self.expect('}')
+    def make_array(self, elements):
+        return elements
 
-        return d
+    def make_object(self, members):
+        return members
 
-    def grab_member(self):
+    def grab_member_key(self):
         self.pass_whitespace()
         key = self.grab_string()
+        if self.interner is not None:
+            key = self.interner(key)
         self.pass_whitespace()
         self.expect(':')
-        value = self.grab_element()
-
-        return key, value
-
-    def grab_members(self, members):
-        key, value = self.grab_member()
-
-        if key in members:
-            self.throw_exception("Repeat key: " + repr(key))
-        else:
-            members[key] = value
-
-        if self.next() == ',':
-            self.advance()
-            return self.grab_members(members)
-        else:
-            return members
+        return key
 
     def grab_string(self, allow_lb=False):
         self.expect('"')
@@ -397,29 +879,29 @@ class Parser:
         return s
 
     def grab_characters(self, allow_lb):
-        s = ""
-        while self.next() != '"':
-            if self.eol():
+        text = self.text
+        chunks = []
+        while True:
+            if self.eof():
+                self.throw_exception("Expected '\"'")
+
+            end = STRING_RUN.match(text, self.pos).end()
+            if end > self.pos:
+                chunks.append(text[self.pos:end])
+                self.pos = end
+
+            c = text[end]
+            if c == '"':
+                return "".join(chunks)
+            elif c == '\\':
+                self.advance()
+                chunks.append(self.grab_escape())
+            else:
                 if not allow_lb:
                     self.throw_exception("Line break not allowed here")
                 self.pass_whitespace()
-                if s[-1] not in " \t\r":
-                    s += ' '
-            else:
-                s += self.grab_character()
-        return s
-
-    def grab_character(self):
-        if self.next() == '\\':
-            self.advance()
-            e = self.grab_escape()
-            return e
-        elif self.next() == '"':
-            self.throw_exception("Expected a character")
-        else:
-            c = self.next()
-            self.advance()
-            return c
+                if not chunks or chunks[-1][-1] not in INLINE_WHITESPACE:
+                    chunks.append(' ')
 
     def grab_escape(self):
         if self.next() in SINGLE_CHAR_ESCAPES:
@@ -427,56 +909,576 @@ class Parser:
             self.advance()
             return c
         elif self.next() == 'u':
-            pass
-            # TODO: hex escapes
+            self.advance()
+            c = self.grab_hex_escape()
+            if 0xd800 <= c <= 0xdbff and self.text.startswith('\\u', self.pos):
+                bp = self.breakpoint()
+                self.advance(2)
+                low = self.grab_hex_escape()
+                if 0xdc00 <= low <= 0xdfff:
+                    return chr(0x10000 + ((c - 0xd800) << 10) + (low - 0xdc00))
+                self.jump(bp)
+            return chr(c)
         else:
             self.throw_exception("Invalid escape sequence.")
 
+    def grab_hex_escape(self):
+        m = HEX_RUN.match(self.text, self.pos)
+        if m is None:
+            self.throw_exception("Invalid escape sequence.")
+        self.pos = m.end()
+        return int(m.group(), 16)
+
     def grab_labels(self):
-        label = self.grab_label()
-        if label == '':
-            self.throw_exception("Expected label")
+        labels = []
+        while True:
+            label = self.grab_label()
+            if label == '':
+                self.throw_exception("Expected label")
+            labels.append(label)
 
-        self.pass_whitespace()
+            self.pass_whitespace()
 
-        if self.next() == ',':
+            if self.next() != ',':
+                return labels
             self.advance()
             self.pass_whitespace()
-            labels = self.grab_labels()
+
+    def grab_label(self):
+        start = self.pos
+        self.pos = LABEL_RUN.match(self.text, start).end()
+        return self.text[start:self.pos]
+
+    def iter_events(self, stream, chunk_size=CHUNK_SIZE, check_schema=True, items_prefix=None):
+        # Parses the default export of a JXON document read incrementally from
+        # stream, yielding (event, path, value) tuples instead of building the whole
+        # object tree. path is a tuple of the object keys and array indices leading
+        # to the value. Events are start_map, map_key, end_map, start_array,
+        # end_array and value; value carries every value that is not itself an
+        # array or object (including XML elements and variable references).
+        #
+        # Elements of arrays whose path matches items_prefix are parsed whole and
+        # reported as item events instead. In a prefix, "item" matches any array
+        # index. With check_schema set, every array is checked for consistent
+        # element types as its elements stream by.
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+
+        self.stream_step(self.read_header)
+        if self.eof() or self.next(6) == "export":
+            # the default export, if any, is a variable that has already been parsed
+            self.stream_step(self.read_trailer)
+            if self.module.default_export is not None:
+                yield "value", (), self.module.default_export
+            return
+
+        stack = []
+        path = ()
+        while True:
+            c = self.stream_step(self.peek_element)
+
+            if stack and stack[-1][0] is list and self.is_items_path(stack[-1][1], items_prefix):
+                value = self.stream_step(self.grab_element)
+                yield "item", path, value
+                value_type = self.stream_item_type(value, stack[-1], check_schema)
+
+            elif c == '[':
+                self.advance()
+                yield "start_array", path, None
+
+                if self.single_element_arrays or self.stream_step(self.peek_element) != ']':
+                    stack.append([list, path, 0, None, None])
+                    path = path + (0,)
+                    continue
+
+                self.advance()
+                yield "end_array", path, None
+                value_type = JXONType(list, None)
+
+            elif c == '{':
+                self.advance()
+                yield "start_map", path, None
+
+                if self.stream_step(self.peek_element) != '}':
+                    key = self.stream_step(self.grab_member_key)
+                    yield "map_key", path, key
+                    stack.append([dict, path, key, {}, None])
+                    path = path + (key,)
+                    continue
+
+                self.advance()
+                yield "end_map", path, None
+                value_type = JXONType(dict, {})
+
+            else:
+                value = self.stream_step(self.grab_value)
+                yield "value", path, value
+                value_type = self.stream_type(value, check_schema)
+
+            while stack:
+                frame = stack[-1]
+                container, path, key, member_types, _ = frame
+
+                if container is list:
+                    if check_schema:
+                        try:
+                            frame[3] = merge_types(member_types, value_type)
+                        except JXONSchemaValidityException as e:
+                            self.throw_exception(str(e))
+
+                    c = self.stream_step(self.peek_element)
+                    if not self.single_element_arrays and c == ',':
+                        self.advance()
+                        frame[2] += 1
+                        path = path + (frame[2],)
+                        break
+                    self.stream_step(lambda: self.expect(']'))
+                    yield "end_array", path, None
+                    value_type = JXONType(list, frame[3])
+
+                else:
+                    if key in member_types:
+                        self.throw_exception("Repeat key: " + repr(key))
+                    member_types[key] = value_type
+
+                    c = self.stream_step(self.peek_element)
+                    if c == ',':
+                        self.advance()
+                        key = self.stream_step(self.grab_member_key)
+                        yield "map_key", path, key
+                        frame[2] = key
+                        path = path + (key,)
+                        break
+                    self.stream_step(lambda: self.expect('}'))
+                    yield "end_map", path, None
+                    value_type = JXONType(dict, member_types)
+
+                stack.pop()
+
+            else:
+                break
+
+        self.stream_step(self.read_trailer)
+
+    def scan_members(self, stream, chunk_size=CHUNK_SIZE):
+        # Reads a JXON document from a stream of UTF-8 text in one pass, without
+        # keeping the members of its default export, which must be an array or
+        # object. Returns the byte offset of the default export, the keys of its
+        # members (None for an array), and the byte offsets at which the values
+        # of its members start, followed by the offset of its closing bracket.
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.stream_bytes = 0
+
+        self.stream_step(self.read_header)
+        c = self.stream_step(self.peek_element)
+        if c not in JSON_CONTAINER_START:
+            self.throw_exception("Expected the default export to be an array or object")
+
+        start = self.byte_position()
+        self.advance()
+        keys = None if c == '[' else []
+        seen = set()
+        offsets = array('q')
+        close = ']' if c == '[' else '}'
+
+        if self.stream_step(self.peek_element) != close:
+            while True:
+                if keys is not None:
+                    key = self.stream_step(self.grab_member_key)
+                    if key in seen:
+                        self.throw_exception("Repeat key: " + repr(key))
+                    seen.add(key)
+                    keys.append(key)
+
+                offsets.append(self.byte_position())
+                self.stream_step(self.grab_element)
+                if self.stream_step(self.peek_element) != ',' or (keys is None and self.single_element_arrays):
+                    break
+                self.advance()
+
+        offsets.append(self.byte_position())
+        self.stream_step(lambda: self.expect(close))
+        self.stream_step(self.read_trailer)
+        if self.module.default_export is not None:
+            self.throw_exception("Expected the default export to be an array or object")
+
+        return start, keys, offsets
+
+    def byte_position(self):
+        # The byte offset of the cursor in the stream, counted on from the last
+        # offset asked for unless the window has moved since
+        mark_bytes, mark_pos, offset = self.byte_mark or (None, 0, 0)
+        if mark_bytes != self.stream_bytes:
+            mark_pos, offset = 0, self.stream_bytes
+        offset += len(self.text[mark_pos:self.pos].encode('utf-8'))
+        self.byte_mark = (self.stream_bytes, self.pos, offset)
+        return offset
+
+    def stream_step(self, step):
+        # Runs step against the buffered window of the stream. If it fails or ends
+        # close enough to the end of the window that more input could change its
+        # outcome, more of the stream is read and the step is retried from the same
+        # place. Steps must therefore not have side effects beyond moving the cursor.
+        start = self.pos
+        while True:
+            self.json_budget = len(self.text) if self.json_fast_path else 0
+            try:
+                result = step()
+                if self.stream is None or self.pos < len(self.text) - LOOKAHEAD:
+                    return result
+            except (Exception, self.exception_class, VariableResolutionException):
+                if self.stream is None or self.pos < len(self.text) - LOOKAHEAD:
+                    raise
+
+            self.pos = start
+            self.fill()
+            start = self.pos
+
+    def fill(self):
+        # Drops the already parsed part of the window and reads more of the stream.
+        # Each read is at least as long as the current window, so a token that
+        # needs many reads to fit is rescanned only a logarithmic number of times.
+        consumed = self.text[:self.pos]
+        lb = consumed.rfind("\n")
+        if lb == -1:
+            self.col_offset += len(consumed)
         else:
-            labels = []
+            self.line_offset += consumed.count("\n")
+            self.col_offset = len(consumed) - lb - 1
+        if self.stream_bytes is not None:
+            self.stream_bytes += len(consumed.encode('utf-8'))
 
-        return [label] + labels
+        self.text = self.text[self.pos:]
+        self.pos = 0
 
-    def grab_label(self):
-        s = ""
-        while self.next(permit_eol=True) in LETTERS | DIGITS | {'_'}:
-            s += self.next()
-            self.advance()
-        return s
+        chunk = self.stream.read(max(self.chunk_size, len(self.text)))
+        if chunk:
+            self.text += chunk
+        else:
+            self.text += "\n"
+            self.stream = None
+
+    def read_header(self):
+        self.module = Module()
+        self.pass_whitespace()
+        self.read_imports()
+        self.read_variables()
+
+    def read_trailer(self):
+        self.pass_whitespace()
+        if not self.eof():
+            self.read_exports()
+
+    def peek_element(self):
+        self.pass_whitespace()
+        return self.next()
+
+    def stream_item_type(self, value, frame, check_schema):
+        # Items usually match the element type merged so far, and once that has no
+        # nulls left in it, merging a matching item cannot change it, so it is
+        # checked with a compiled validator instead. The last type and validator
+        # are kept in the frame.
+        element_type = frame[3]
+        if check_schema and element_type is not None:
+            if frame[4] is None or frame[4][0] is not element_type:
+                frame[4] = (element_type, element_type.compile() if is_complete_type(element_type) else None)
+            validator = frame[4][1]
+            if validator is not None and validator(value):
+                return element_type
+
+        return self.stream_type(value, check_schema)
+
+    def stream_type(self, value, check_schema):
+        if not check_schema:
+            return None
+
+        try:
+            return parse_type(value)
+        except JXONSchemaValidityException as e:
+            self.throw_exception(str(e))
+
+    @staticmethod
+    def is_items_path(path, prefix):
+        if prefix is None or len(path) != len(prefix):
+            return False
+
+        return all(
+            p == key or (p == "item" and type(key) is int)
+            for p, key in zip(prefix, path)
+        )
 
 
 def jxon_string_escape(s):
-    for escape, char in SINGLE_CHAR_ESCAPES.items():
-        if char != '/':
-            s = s.replace(char, '\\' + escape)
-    return s  # TODO: more?
+    # Escapes the same way as the json module's encoder (with ensure_ascii off),
+    # so that subtrees handed to it are encoded identically
+    return json.encoder.encode_basestring(s)[1:-1]
 
 
 def loads_factory(parser_class):
-    def loads(s):
+    def loads(s, schema=None, records=None, lazy=False, intern=None, xml=None, lazy_xml=False, stats=None):
+        check_lazy(lazy, schema, records)
         parser = parser_class(s)
-        return parser.parse()
+        parser.schema = schema
+        parser.lazy = lazy
+        parser.use_interner(make_interner(intern))
+        parser.xml_backend = make_xml_backend(xml)
+        parser.lazy_xml = lazy_xml
+        parser.stats = stats
+        module = timed_parse(stats, None, parser.parse_as_module)
+        return decode_records(module.default_export, records)
 
     return loads
 
 
+def iterparse_factory(parser_class):
+    def iterparse(fp, chunk_size=CHUNK_SIZE, check_schema=True, intern=None, xml=None):
+        curr_dir = os.path.dirname(getattr(fp, "name", ""))
+        parser = parser_class("", curr_dir=curr_dir)
+        parser.use_interner(make_interner(intern))
+        parser.xml_backend = make_xml_backend(xml)
+        return parser.iter_events(fp, chunk_size=chunk_size, check_schema=check_schema)
+
+    return iterparse
+
+
+def iter_items_factory(parser_class):
+    def iter_items(fp, prefix, chunk_size=CHUNK_SIZE, check_schema=True, intern=None, xml=None):
+        if type(prefix) is str:
+            prefix = tuple(prefix.split(".")) if prefix else ()
+
+        curr_dir = os.path.dirname(getattr(fp, "name", ""))
+        parser = parser_class("", curr_dir=curr_dir)
+        parser.use_interner(make_interner(intern))
+        parser.xml_backend = make_xml_backend(xml)
+        events = parser.iter_events(fp, chunk_size=chunk_size, check_schema=check_schema, items_prefix=tuple(prefix))
+        for event, _, value in events:
+            if event == "item":
+                yield value
+
+    return iter_items
+
+
+def scan_import_graph(filepath, s, parser_class):
+    # Maps (filepath, parser class) for every file reachable through import
+    # sections to the keys of the files it imports. Files that cannot be read or
+    # scanned, and files on an import cycle, are left out along with everything
+    # that imports them, so that the sequential parse reports the error.
+    root = (os.path.abspath(filepath), parser_class)
+    graph = {}
+    broken = set()
+
+    queue = [(root, s)]
+    while queue:
+        key, s = queue.pop()
+        if key in graph or key in broken:
+            continue
+
+        filepath, parser_class = key
+        try:
+            if s is None:
+                with open(filepath, 'r') as fh:
+                    s = fh.read()
+            imports = parser_class(s, os.path.dirname(filepath)).scan_imports()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except BaseException:
+            broken.add(key)
+            continue
+
+        graph[key] = imports
+        queue.extend((dependency, None) for dependency in imports)
+
+    # depth-first search for cycles, where a file is in progress while it is on the stack
+    in_progress = set()
+    finished = set()
+    for start in graph:
+        if start in finished:
+            continue
+
+        stack = [(start, iter(graph[start]))]
+        in_progress.add(start)
+        while stack:
+            key, imports = stack[-1]
+            for dependency in imports:
+                if dependency in in_progress:
+                    keys = [k for k, _ in stack]
+                    broken.update(keys[keys.index(dependency):])
+                elif dependency in graph and dependency not in finished:
+                    stack.append((dependency, iter(graph[dependency])))
+                    in_progress.add(dependency)
+                    break
+            else:
+                stack.pop()
+                in_progress.discard(key)
+                finished.add(key)
+                if any(dependency in broken for dependency in graph[key]):
+                    broken.add(key)
+
+    return {key: imports for key, imports in graph.items() if key not in broken}
+
+
+def prefetch_worker_init(directory, readonly):
+    disk_cache.directory = directory
+    disk_cache.readonly = readonly
+
+
+def prefetch_worker(key, dependency_entries):
+    # Runs in a worker process: parses one file, with the cache entries of
+    # everything it imports already in place. Failures are left for the
+    # sequential parse to report.
+    filepath, parser_class = key
+    for dependency, entry in dependency_entries:
+        module_cache.store(dependency, entry)
+
+    try:
+        return module_cache.load_entry(filepath, parser_class)
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except BaseException:
+        return None
+
+
+def prefetch_imports(filepath, s, parser_class, workers):
+    # Parses everything imported, directly or indirectly, by the file in a pool of
+    # worker processes, leaving the results in the module cache. Files are
+    # submitted as soon as everything they import has been parsed.
+    graph = scan_import_graph(filepath, s, parser_class)
+    graph.pop((os.path.abspath(filepath), parser_class), None)
+
+    entries = {}
+    for key in graph:
+        entry = module_cache.fresh_entry(key)
+        if entry is not None:
+            entries[key] = entry
+
+    pending = {key: imports for key, imports in graph.items() if key not in entries}
+    failed = set()
+    running = {}
+
+    with ProcessPoolExecutor(workers, initializer=prefetch_worker_init,
+                             initargs=(disk_cache.directory, disk_cache.readonly)) as executor:
+        while pending or running:
+            for key, imports in list(pending.items()):
+                if any(dependency in failed for dependency in imports):
+                    failed.add(key)
+                    del pending[key]
+                elif all(dependency in entries for dependency in imports):
+                    dependency_entries = collect_entries(imports, graph, entries)
+                    running[executor.submit(prefetch_worker, key, dependency_entries)] = key
+                    del pending[key]
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                entry = future.result()
+                if entry is None:
+                    failed.add(key)
+                else:
+                    entries[key] = entry
+                    module_cache.store(key, entry)
+
+
+def collect_entries(imports, graph, entries):
+    # the entries of the given files and everything they import, for seeding a
+    # worker's module cache
+    collected = {}
+    stack = list(imports)
+    while stack:
+        key = stack.pop()
+        if key not in collected:
+            collected[key] = entries[key]
+            stack.extend(graph[key])
+    return list(collected.items())
+
+
 def load_factory(parser_class):
-    def loads(fp):
+    def loads(fp, workers=None, schema=None, records=None, lazy=False, intern=None, xml=None, lazy_xml=False,
+              stats=None):
         s = fp.read()
-        curr_dir = os.path.dirname(fp.name)
-        parser = parser_class(s, curr_dir=curr_dir)
-        return parser.parse()
+        filepath = os.path.abspath(fp.name)
+
+        # with workers, imported files are parsed up front in parallel, after which
+        # the sequential parse below finds them in the module cache
+        if workers is not None and parser_class.module_cache is not None:
+            prefetch_imports(filepath, s, parser_class, workers)
+
+        return load_source(s, filepath, parser_class, schema, records, lazy, intern, xml, lazy_xml, stats)
 
     return loads
 
+
+def load_source(s, filepath, parser_class, schema=None, records=None, lazy=False, intern=None, xml=None,
+                lazy_xml=False, stats=None):
+    # what load returns for the file at filepath, whose text s has already been read
+    check_lazy(lazy, schema, records)
+    module = timed_parse(stats, filepath, lambda: parse_file(s, filepath, parser_class, schema, lazy,
+                                                             make_interner(intern), make_xml_backend(xml),
+                                                             lazy_xml))
+    return decode_records(module.default_export, records)
+
+
+def timed_parse(stats, filepath, parse):
+    # Runs parse, which parses a whole file into a module, as a file span of
+    # stats, which the parsers of the files it imports time themselves into too
+    if stats is None:
+        return parse()
+
+    previous = import_stats()
+    IMPORTING.stats = stats
+    span = stats.start("file", filepath)
+    try:
+        module = parse()
+    finally:
+        IMPORTING.stats = previous
+        span.cached = not span.children
+        stats.end(span)
+
+    if module.default_export is not None:
+        stats.count(module.default_export)
+    return module
+
+
+def check_lazy(lazy, schema, records):
+    # validating against a schema and laying out records both need every value
+    # parsed up front, which is just what lazy proxies put off
+    if lazy and not (schema is None and (records is None or records is False)):
+        raise ValueError("lazy=True can't be combined with schema or records")
+
+
+def decode_records(value, records):
+    # records is either a type to lay records out by, True to infer it, or None
+    # to leave objects as dicts
+    if records is None or records is False:
+        return value
+    return to_records(value, None if records is True else records)
+
+
+def parse_file(s, filepath, parser_class, schema=None, lazy=False, interner=None, xml_backend=ETREE_BACKEND,
+               lazy_xml=False):
+    importing = import_stack()
+    importing.append(os.path.abspath(filepath))
+    try:
+        if schema is None and not (lazy or lazy_xml) and interner is None and xml_backend is ETREE_BACKEND:
+            return disk_cache.parse(s, filepath, parser_class)
+
+        # validation and interning happen during the parse, proxies refer back to
+        # the source, and the disk cache only holds ElementTree elements, so it is
+        # bypassed
+        parser = parser_class(s, os.path.dirname(filepath))
+        parser.schema = schema
+        parser.lazy = lazy
+        parser.use_interner(interner)
+        parser.xml_backend = xml_backend
+        parser.lazy_xml = lazy_xml
+        return parser.parse_as_module()
+    finally:
+        importing.pop()
+
@@ -0,0 +1,129 @@
+from collections.abc import Mapping
+
+from .jxontype import parse_type
+
+
+class JXONRecord(Mapping):
+    """
+    A read-only object whose values are stored in a tuple, with the keys kept
+    once per layout on a class generated by record_class, rather than in a hash
+    table per object. Records behave like read-only dicts, compare equal to
+    dicts with the same items, and are encoded like dicts.
+    """
+
+    __slots__ = ("_values",)
+    _keys = ()
+    _index = {}
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._index[key]]
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def items(self):
+        return zip(self._keys, self._values)
+
+    def values(self):
+        return iter(self._values)
+
+    def __repr__(self):
+        return "JXONRecord(" + repr(dict(self.items())) + ")"
+
+    def __reduce__(self):
+        return make_record, (self._keys, self._values)
+
+    def to_dict(self):
+        # converts this record, and any records nested in it, back into dicts
+        return unpack_records(self)
+
+
+RECORD_CLASSES = {}
+
+
+def record_class(keys):
+    # returns the record class for the given tuple of keys, creating it the first time
+    cls = RECORD_CLASSES.get(keys)
+    if cls is None:
+        index = {key: i for i, key in enumerate(keys)}
+        cls = RECORD_CLASSES[keys] = type("JXONRecord", (JXONRecord,), {
+            "__module__": __name__,
+            "__slots__": (),
+            "_keys": keys,
+            "_index": index,
+        })
+    return cls
+
+
+def make_record(keys, values):
+    return record_class(keys)(values)
+
+
+def to_records(obj, jxon_type=None):
+    # Replaces every object in obj that has exactly the keys of the corresponding
+    # object type with a record sharing the key layout of that type. If no type
+    # is given, it is inferred with parse_type.
+    if jxon_type is None:
+        jxon_type = parse_type(obj)
+
+    # containers are listed parents first, so that going through the list in
+    # reverse converts every object after everything inside it
+    root = [obj]
+    nodes = [(root, 0, obj, jxon_type)]
+    i = 0
+    while i < len(nodes):
+        _, _, value, value_type = nodes[i]
+        i += 1
+        if value_type is None:
+            continue
+
+        if type(value) is list and value_type.jxon_type is list:
+            for j, e in enumerate(value):
+                if type(e) is list or type(e) is dict:
+                    nodes.append((value, j, e, value_type.subtype))
+
+        elif type(value) is dict and value_type.jxon_type is dict:
+            for key, member in value.items():
+                if (type(member) is list or type(member) is dict) and key in value_type.subtype:
+                    nodes.append((value, key, member, value_type.subtype[key]))
+
+    for parent, key, value, value_type in reversed(nodes):
+        if type(value) is dict and value_type is not None and value_type.jxon_type is dict \
+                and value.keys() == value_type.subtype.keys():
+            keys = tuple(value_type.subtype)
+            parent[key] = record_class(keys)(tuple([value[k] for k in keys]))
+
+    return root[0]
+
+
+def unpack_records(obj):
+    # the inverse of to_records, returning obj with every record replaced by a dict
+    if not isinstance(obj, (list, dict, JXONRecord)):
+        return obj
+
+    root = [obj]
+    stack = [(root, 0)]
+    while stack:
+        parent, key = stack.pop()
+        value = parent[key]
+        if isinstance(value, JXONRecord):
+            value = parent[key] = dict(value.items())
+
+        if type(value) is list:
+            stack.extend((value, j) for j, e in enumerate(value) if isinstance(e, (list, dict, JXONRecord)))
+        elif type(value) is dict:
+            stack.extend((value, k) for k, e in value.items() if isinstance(e, (list, dict, JXONRecord)))
+
+    return root[0]
@@ -0,0 +1,140 @@
+import time
+
+from .lazy import LazyContainer, LazyElement
+from .records import JXONRecord
+from .xmlbackends import element_backend
+
+NODE_KINDS = ("objects", "arrays", "strings", "numbers", "booleans", "nulls", "xml_elements", "lazy")
+
+
+class Span:
+    """
+    One timed part of a parse: a file, or one of the phases of parsing a file
+    (imports, variables, default export and exports), along with the spans
+    inside it. The imports phase of a file holds a file span for each file it
+    imports, which is marked cached if it was found in a cache rather than
+    parsed.
+
+    duration is in seconds, and nbytes is the size in UTF-8 of the source text
+    the span covers, which for a file is the sum over its phases.
+    """
+
+    def __init__(self, name, path=None, offset=0):
+        self.name = name
+        self.path = path
+        # where the span starts in the text of its file
+        self.offset = offset
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.nbytes = 0
+        self.cached = False
+        self.children = []
+
+    @property
+    def duration(self):
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    def report(self):
+        return {
+            "name": self.name,
+            "path": self.path,
+            "duration": self.duration,
+            "bytes": self.nbytes,
+            "cached": self.cached,
+            "children": [child.report() for child in self.children],
+        }
+
+    def __repr__(self):
+        return "<Span %s%s %.6fs>" % (self.name, "" if self.path is None else " " + self.path, self.duration)
+
+
+class ParseStats:
+    """
+    Collects timings of the loads it is passed to as stats=: a tree of spans for
+    every file loaded and every phase of parsing it, along with the number of
+    values of each kind the loads returned. One ParseStats may be passed to
+    several loads, each of which adds a top-level span.
+
+    on_start and on_end, if given, are called with each Span as it starts and
+    ends, for instance to forward spans to a tracing system. report() sums
+    everything up as a dict of plain values.
+    """
+
+    def __init__(self, on_start=None, on_end=None):
+        self.on_start = on_start
+        self.on_end = on_end
+        self.spans = []
+        self.nodes = dict.fromkeys(NODE_KINDS, 0)
+        # the spans that have started and not yet ended, outermost first
+        self.stack = []
+
+    def start(self, name, path=None, offset=0):
+        span = Span(name, path, offset)
+        (self.stack[-1].children if self.stack else self.spans).append(span)
+        self.stack.append(span)
+        if self.on_start is not None:
+            self.on_start(span)
+        return span
+
+    def end(self, span, text=None):
+        # Ends span, along with any spans inside it still going, as happens when
+        # a parse is cut short by an error. text is the source it covered.
+        while self.stack and self.stack[-1] is not span:
+            self.end(self.stack[-1])
+        if not self.stack:
+            return
+
+        self.stack.pop()
+        span.end_time = time.perf_counter()
+        if text is not None:
+            span.nbytes = len(text.encode('utf-8', 'surrogatepass'))
+        elif span.name == "file":
+            span.nbytes = sum(child.nbytes for child in span.children)
+        if self.on_end is not None:
+            self.on_end(span)
+
+    def count(self, value):
+        # Counts the values in value by kind, walking it with an explicit stack.
+        # Lazy proxies are counted as they are, without parsing them.
+        nodes = self.nodes
+        stack = [value]
+        while stack:
+            o = stack.pop()
+            t = type(o)
+            if t is str:
+                nodes["strings"] += 1
+            elif t is bool:
+                nodes["booleans"] += 1
+            elif t is int or t is float:
+                nodes["numbers"] += 1
+            elif o is None:
+                nodes["nulls"] += 1
+            elif t is dict or isinstance(o, JXONRecord):
+                nodes["objects"] += 1
+                stack.extend(o.values())
+            elif t is list:
+                nodes["arrays"] += 1
+                stack.extend(o)
+            elif isinstance(o, LazyContainer) or (isinstance(o, LazyElement) and o.verbatim() is not None):
+                nodes["lazy"] += 1
+            elif element_backend(o) is not None:
+                nodes["xml_elements"] += 1
+                stack.extend(element_backend(o).children(o))
+
+    def report(self):
+        # every file parsed, including those imported, counts towards the bytes
+        wall_time = sum(span.duration for span in self.spans)
+        nbytes = 0
+        stack = list(self.spans)
+        while stack:
+            span = stack.pop()
+            if span.name == "file":
+                nbytes += span.nbytes
+            stack.extend(span.children)
+        return {
+            "wall_time": wall_time,
+            "bytes": nbytes,
+            "bytes_per_second": nbytes / wall_time if wall_time else 0.0,
+            "nodes": dict(self.nodes),
+            "spans": [span.report() for span in self.spans],
+        }
@@ -0,0 +1,269 @@
+from xml.etree import ElementTree as ET
+
+from .lazy import LazyElement
+
+XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+
+
+class XMLBackend:
+    """
+    Decides what XML elements a parse produces. Parsers build elements with
+    element(), sub_element() (which also appends the new element to its parent)
+    and close() once all of an element's children are in, and set their text and
+    tail attributes directly.
+
+    The encoder, jxon_equal, fingerprint, the binary encoding and schema checks
+    read elements of any backend through tag(), items() and children(), along
+    with their text and tail attributes, so values from different backends can be
+    mixed, compared and dumped alike.
+    """
+
+    name = None
+    element_type = None
+
+    def element(self, tag, attributes):
+        raise NotImplementedError
+
+    def sub_element(self, parent, tag, attributes):
+        raise NotImplementedError
+
+    def close(self, e):
+        pass
+
+    def tag(self, e):
+        return e.tag
+
+    def items(self, e):
+        return e.items()
+
+    def children(self, e):
+        return e
+
+
+class ElementTreeBackend(XMLBackend):
+    name = "etree"
+    element_type = ET.Element
+
+    def element(self, tag, attributes):
+        return ET.Element(tag, attributes)
+
+    def sub_element(self, parent, tag, attributes):
+        return ET.SubElement(parent, tag, attributes)
+
+
+class CompactElement:
+    """
+    A read-only XML element that takes up much less memory than an ElementTree
+    one. Attributes are kept as a flat tuple of names and values and children as
+    a tuple, and elements without attributes or children share the empty tuple.
+
+    It reads like an ElementTree element - tag, text, tail, attrib, items(),
+    keys(), get(), len(), indexing and iteration over its children - but has no
+    methods for changing it.
+    """
+
+    __slots__ = ("tag", "attributes", "text", "tail", "children")
+
+    def __init__(self, tag, attributes=(), text=None, tail=None, children=()):
+        self.tag = tag
+        self.attributes = attributes
+        self.text = text
+        self.tail = tail
+        self.children = children
+
+    @property
+    def attrib(self):
+        return dict(self.items())
+
+    def items(self):
+        return list(zip(self.attributes[::2], self.attributes[1::2]))
+
+    def keys(self):
+        return list(self.attributes[::2])
+
+    def get(self, key, default=None):
+        names = self.attributes[::2]
+        return self.attributes[2 * names.index(key) + 1] if key in names else default
+
+    def __len__(self):
+        return len(self.children)
+
+    def __getitem__(self, index):
+        return self.children[index]
+
+    def __iter__(self):
+        return iter(self.children)
+
+    def __repr__(self):
+        return "<%s %r at %#x>" % (type(self).__name__, self.tag, id(self))
+
+
+class CompactBackend(XMLBackend):
+    name = "compact"
+    element_type = CompactElement
+
+    def element(self, tag, attributes):
+        return CompactElement(tag, sum(attributes.items(), ()) if attributes else ())
+
+    def sub_element(self, parent, tag, attributes):
+        # children are collected in a list until the parent is closed
+        e = CompactElement(tag, sum(attributes.items(), ()) if attributes else ())
+        children = parent.children
+        if children:
+            children.append(e)
+        else:
+            parent.children = [e]
+        return e
+
+    def close(self, e):
+        if e.children:
+            e.children = tuple(e.children)
+
+
+class LxmlBackend(XMLBackend):
+    # lxml keeps namespaced names as {namespace}name and namespace declarations
+    # out of the attributes, so prefixed names are resolved against the
+    # declarations in scope when elements are built, and turned back into the
+    # prefixed names and xmlns attributes they were written with when read
+
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree
+        self.etree = etree
+        self.element_type = etree._Element
+
+    def element(self, tag, attributes):
+        return self.make(None, tag, attributes)
+
+    def sub_element(self, parent, tag, attributes):
+        return self.make(parent, tag, attributes)
+
+    def make(self, parent, tag, attributes):
+        nsmap = {}
+        attrib = {}
+        for name, value in attributes.items():
+            if name == "xmlns":
+                nsmap[None] = value
+            elif name.startswith("xmlns:"):
+                nsmap[name[6:]] = value
+            else:
+                attrib[name] = value
+
+        scope = dict(parent.nsmap) if parent is not None else {}
+        scope.update(nsmap)
+        # xmlns="" undeclares the default namespace, which lxml has no entry for
+        nsmap = {prefix: uri for prefix, uri in nsmap.items() if uri}
+        tag = qualify(tag, scope, scope.get(None))
+        attrib = {qualify(name, scope, None): value for name, value in attrib.items()}
+
+        if parent is None:
+            return self.etree.Element(tag, attrib, nsmap=nsmap or None)
+        return self.etree.SubElement(parent, tag, attrib, nsmap=nsmap or None)
+
+    def tag(self, e):
+        return unqualify(e.tag, {} if e.prefix is None else {e.nsmap[e.prefix]: e.prefix})
+
+    def items(self, e):
+        parent = e.getparent()
+        inherited = parent.nsmap if parent is not None else {}
+        nsmap = e.nsmap
+        items = [("xmlns" if prefix is None else "xmlns:" + prefix, uri)
+                 for prefix, uri in nsmap.items() if inherited.get(prefix) != uri]
+
+        prefixes = {uri: prefix for prefix, uri in nsmap.items() if prefix is not None}
+        prefixes[XML_NAMESPACE] = "xml"
+        items.extend((unqualify(name, prefixes), value) for name, value in e.items())
+        return items
+
+    def children(self, e):
+        # leaving out comments and processing instructions
+        return [child for child in e if type(child) is self.element_type]
+
+
+class LazyElementBackend(XMLBackend):
+    # Lazy XML values are read through the backend of the element they build.
+    # They are only ever made by the parser, so this backend makes nothing.
+
+    name = "lazy"
+    element_type = LazyElement
+
+    def tag(self, e):
+        e = e.element()
+        return element_backend(e).tag(e)
+
+    def items(self, e):
+        e = e.element()
+        return element_backend(e).items(e)
+
+    def children(self, e):
+        e = e.element()
+        return element_backend(e).children(e)
+
+
+def qualify(name, scope, default_namespace):
+    prefix, colon, local = name.partition(":")
+    if not colon:
+        return "{" + default_namespace + "}" + name if default_namespace else name
+
+    namespace = XML_NAMESPACE if prefix == "xml" else scope.get(prefix)
+    if not namespace:
+        raise ValueError("Unbound namespace prefix: " + prefix)
+    return "{" + namespace + "}" + local
+
+
+def unqualify(name, prefixes):
+    if name[0] != "{":
+        return name
+    namespace, local = name[1:].split("}", 1)
+    prefix = prefixes.get(namespace)
+    return local if prefix is None else prefix + ":" + local
+
+
+ETREE_BACKEND = ElementTreeBackend()
+COMPACT_BACKEND = CompactBackend()
+
+BACKEND_CLASSES = {
+    "etree": ElementTreeBackend,
+    "compact": CompactBackend,
+    "lxml": LxmlBackend,
+}
+
+# the backend behind each type of element, which lxml's elements are only added
+# to once it is used, so that it isn't imported unless needed
+ELEMENT_BACKENDS = {
+    ET.Element: ETREE_BACKEND,
+    CompactElement: COMPACT_BACKEND,
+    LazyElement: LazyElementBackend(),
+}
+
+
+def make_xml_backend(xml):
+    # xml is either an XMLBackend, the name of one, or None for ElementTree
+    if xml is None:
+        return ETREE_BACKEND
+    elif isinstance(xml, XMLBackend):
+        backend = xml
+    elif xml in BACKEND_CLASSES:
+        backend = next((b for b in ELEMENT_BACKENDS.values() if type(b) is BACKEND_CLASSES[xml]), None)
+        if backend is None:
+            backend = BACKEND_CLASSES[xml]()
+    else:
+        raise ValueError("Unknown XML backend: " + repr(xml))
+
+    ELEMENT_BACKENDS.setdefault(backend.element_type, backend)
+    return backend
+
+
+def element_backend(o):
+    # the backend o is an element of, or None if it isn't an XML element
+    backend = ELEMENT_BACKENDS.get(type(o))
+    if backend is None and type(o).__module__ == "lxml.etree":
+        backend = make_xml_backend("lxml")
+        if type(o) is not backend.element_type:
+            return None
+    return backend
+
+
+def is_element(o):
+    return element_backend(o) is not None
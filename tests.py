@@ -1,16 +1,34 @@
+import asyncio
+import importlib.util
+import io
 import json
+import os
+import tempfile
 import unittest
+from array import array
+from xml.etree import ElementTree as ET
 
-from jxon import jxsd
+from jxon import jxsd, binary
 from jxon import combined as jxon
-from jxon.jxontype import JXONType
+from jxon.aio import AsyncLoader
+from jxon.cache import ModuleCache, module_cache, disk_cache
+from jxon.records import JXONRecord
+from jxon.lazy import LazyDict, LazyList, LazyElement
+from jxon.fingerprint import fingerprint, FingerprintCache
+from jxon.interning import Interner
+from jxon.stats import ParseStats
+from jxon.xmlbackends import CompactElement
+from jxon.jxontype import JXONType, JXONSchemaValidityException, parse_type
+from jxon.jxon import JXONParseException
+from jxon.combined import CombinedParser
+from jxon import jxon as jxon_module
 
 TEST_JXON = [
     "test.jxon",
 ]
 
 TEST_XML = [
-    # "artelevanto.xml"
+    "artelevanto.xml"
 ]
 
 TEST_JSON = [
@@ -45,5 +63,987 @@ class JSONBackwardsCompatibilityTests(unittest.TestCase):
             self.assertTrue(jxon.jxon_equal(o, jxon.loads(jxon.dumps(o, indent=2))))
 
 
+class ParserTests(unittest.TestCase):
+
+    def test_error_position(self):
+        with self.assertRaises(JXONParseException) as cm:
+            jxon.loads('{\n  "a": 1,\n  "b": @\n}')
+        self.assertEqual(
+            str(cm.exception),
+            '(line 3, col 8) Unknown expression type\n  "b": @\n       ^'
+        )
+
+    def test_multiline_string(self):
+        self.assertEqual(jxon.loads('"Haverford\n    College"'), "Haverford College")
+        self.assertEqual(jxon.loads('"Haverford \n    College"'), "Haverford College")
+
+
+class JSONFastPathTests(unittest.TestCase):
+
+    def test_mixed_document(self):
+        s = '{"a": [1, {"b": [2.5, "c"]}], "x": <p>hi</p>, "d": [1, // one\n 2]}'
+        o = jxon.loads(s)
+        self.assertEqual(o["a"], [1, {"b": [2.5, "c"]}])
+        self.assertEqual(o["x"].text, "hi")
+        self.assertEqual(o["d"], [1, 2])
+
+    def test_unicode_escapes(self):
+        s = '["\\u00e9", "\\ud83d\\ude00", "\\ud83dx"]'
+        self.assertEqual(jxon.loads(s), json.loads(s))
+        self.assertEqual(jxon.loads('"\\u00e9 \\ud83d\\ude00"'), json.loads('"\\u00e9 \\ud83d\\ude00"'))
+
+    def test_json_only_syntax_rejected(self):
+        with self.assertRaises(JXONParseException) as cm:
+            jxon.loads('{"a": 1,\n "a": 2}')
+        self.assertTrue(str(cm.exception).startswith("(line 2, col 8) Repeat key: 'a'"))
+
+        with self.assertRaises(JXONParseException) as cm:
+            jxon.loads('[1e5]')
+        self.assertTrue(str(cm.exception).startswith("(line 1, col 4) Exponent must be followed by sign"))
+
+        self.assertEqual(jxon.loads('NaN = 5\n[NaN]'), [5])
+
+    def test_budget(self):
+        # Each object fails on its comment, and the json module counts the lines
+        # up to the error, so the work of failed attempts grows with how far into
+        # the text they are. The fast path is given up on before it adds up to
+        # quadratic time.
+        s = "[" + ",\n".join('{"id": %d, // the key\n "n": 1}' % i for i in range(2000)) + "]"
+        parser = CombinedParser(s)
+        o = parser.parse()
+        self.assertEqual(o[-1], {"id": 1999, "n": 1})
+        self.assertLessEqual(parser.json_budget, 0)
+
+
+class XMLTests(unittest.TestCase):
+
+    def test_whitespace(self):
+        e = jxon.loads('<a>\n  one\n  two <b/>three<c></c>\n  four  \n</a>')
+        self.assertEqual(e.text, "one two ")
+        self.assertEqual([(c.tag, c.text, c.tail) for c in e], [("b", None, "three"), ("c", "", " four")])
+        self.assertIsNone(e.tail)
+
+        o = jxon.loads('<a x="&#65;&#x42;&amp;">&#233;<!-- comment --> &lt;&#x1F600;&gt;</a>')
+        self.assertEqual(o.get("x"), "AB&")
+        self.assertEqual(o.text, "é <\U0001F600>")
+        self.assertTrue(jxon.jxon_equal(o, jxon.loads(jxon.dumps(o))))
+
+    def test_prolog(self):
+        o = jxon.loads('<?xml version="1.0"?>\n<!-- c -->\n<a xml:lang=\'en\'>hi</a>')
+        self.assertEqual((o.tag, o.attrib, o.text), ("a", {"xml:lang": "en"}, "hi"))
+
+    def test_error_position(self):
+        with self.assertRaises(JXONParseException) as cm:
+            jxon.loads('{"a": 1,\n "x": <p>\n  <b>é</i>\n</p>}')
+        self.assertEqual(str(cm.exception), '(line 3, col 9) Invalid XML: mismatched tag\n  <b>é</i>\n        ^')
+
+
+class XMLBackendTests(unittest.TestCase):
+
+    S = '{"intro": <p id="1">hi\n  <b>there</b> you</p>, "notes": [<q/>, <r x="y">t</r>]}'
+
+    def test_compact(self):
+        o = jxon.loads(self.S, xml="compact")
+        self.assertIsInstance(o["intro"], CompactElement)
+        self.assertEqual((o["intro"].get("id"), o["intro"].text, o["intro"][0].tail), ("1", "hi ", " you"))
+        self.assertTrue(jxon.jxon_equal(o, jxon.loads(self.S)))
+        self.assertEqual(jxon.dumps(o, indent=2), jxon.dumps(jxon.loads(self.S), indent=2))
+        self.assertEqual(fingerprint(o), fingerprint(jxon.loads(self.S)))
+
+        schema = parse_type(o)
+        self.assertEqual(schema.subtype["intro"].jxon_type.__name__, "Element")
+        self.assertTrue(jxon.jxon_equal(jxon.loads(self.S, schema=schema), o))
+        self.assertTrue(jxon.jxon_equal(binary.loads(binary.dumps(o), xml="compact"), o))
+
+        with self.assertRaises(ValueError):
+            jxon.loads(self.S, xml="minidom")
+
+    def test_imports(self):
+        # imported files are parsed with the same backend as the file importing them
+        with tempfile.TemporaryDirectory() as tempdir:
+            files = {
+                "a.jxon": 'import b from "./b.jxon";\n\n{"own": <p/>, "b": b, "c": import("./c.jxon")}',
+                "b.jxon": '[<q>b</q>, import("./c.jxon")]',
+                "c.jxon": '<r x="c"/>',
+            }
+            for name, content in files.items():
+                with open(os.path.join(tempdir, name), "w") as fh:
+                    fh.write(content)
+
+            path = os.path.join(tempdir, "a.jxon")
+            for _ in range(2):
+                with open(path, "r") as fh:
+                    o = jxon.load(fh, xml="compact")
+                self.assertEqual([type(e) for e in [o["own"], o["b"][0], o["b"][1], o["c"]]], [CompactElement] * 4)
+                with open(path, "r") as fh:
+                    self.assertIs(type(jxon.load(fh)["b"][0]), ET.Element)
+
+    @unittest.skipUnless(importlib.util.find_spec("lxml"), "requires lxml")
+    def test_lxml(self):
+        s = '<a xmlns="u" xmlns:t="v" t:x="1"><t:b xml:lang="en">hi</t:b><c/></a>'
+        o = jxon.loads(s, xml="lxml")
+        self.assertEqual(o[0].tag, "{v}b")
+        self.assertEqual(o[0].get("{http://www.w3.org/XML/1998/namespace}lang"), "en")
+        self.assertEqual(jxon.dumps(o), s)
+        self.assertTrue(jxon.jxon_equal(o, jxon.loads(s)))
+        self.assertEqual(jxon.dumps(jxon.loads(self.S, xml="lxml")), jxon.dumps(jxon.loads(self.S)))
+
+        with self.assertRaises(JXONParseException) as cm:
+            jxon.loads('<a><t:b/></a>', xml="lxml")
+        self.assertTrue(str(cm.exception).startswith("(line 1, col 4) Invalid XML: Unbound namespace prefix: t"))
+
+
+class EncoderTests(unittest.TestCase):
+
+    def test_iterencode(self):
+        with open("tests/test.jxon", "r") as fh:
+            o = [jxon.load(fh)] * (jxon_module.JSON_CHUNK_MEMBERS + 1)
+
+        for indent in (None, 2):
+            chunks = list(jxon.iterencode(o, indent=indent, sort_keys=True))
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual("".join(chunks), jxon.dumps(o, indent=indent, sort_keys=True))
+
+            fh = io.StringIO()
+            jxon.dump(o, fh, indent=indent, sort_keys=True)
+            self.assertEqual(fh.getvalue(), jxon.dumps(o, indent=indent, sort_keys=True))
+
+    def test_chunk_size(self):
+        # a large array inside a small object is still streamed member by member
+        o = {"rows": [{"id": i, "tags": ["a", "b"]} for i in range(jxon_module.JSON_CHUNK_MEMBERS * 10)]}
+        for indent in (None, 2):
+            chunks = list(jxon.iterencode(o, indent=indent))
+            self.assertLess(max(len(chunk) for chunk in chunks), 100)
+            self.assertEqual("".join(chunks), jxon.dumps(o, indent=indent))
+
+    def test_non_string_keys(self):
+        for o in [{1: "a", None: 2}, {1: "a", "1": "b"}, {"a": [{"b": {True: 1}}]}]:
+            for big in (False, True):
+                if big:
+                    o = dict(o, **{"k%d" % i: i for i in range(jxon_module.JSON_CHUNK_MEMBERS)})
+                with self.assertRaises(jxon_module.JXONEncodeException):
+                    jxon.dumps(o)
+                with self.assertRaises(jxon_module.JXONEncodeException):
+                    "".join(jxon.iterencode(o))
+                with self.assertRaises(jxon_module.JXONEncodeException):
+                    "".join(jxon_module.iterencode_helper(o, indent=None, sort_keys=True, indent_level=0,
+                                                          chunk_members=0))
+
+    def test_deep_nesting(self):
+        depth = 10**4
+        o = jxon.loads("[" * depth + "]" * depth)
+        self.assertEqual(jxon.dumps(o), "[" * depth + "]" * depth)
+
+    def test_json_encoder(self):
+        xml = jxon.loads('<div a="1">hi <b>there</b></div>')
+        o = {"a": [xml, 1], "b": {"c": [[xml], {"d": xml}]}, "e": 'q"\\\x01', "f": [0.5, True, None]}
+
+        for indent in (None, 0, 2):
+            # streaming member by member must match encoding whole containers at once
+            streamed = "".join(jxon_module.iterencode_helper(o, indent=indent, sort_keys=True, indent_level=0,
+                                                             chunk_members=0))
+            self.assertEqual(jxon.dumps(o, indent=indent, sort_keys=True), streamed)
+            self.assertTrue(jxon.jxon_equal(o, jxon.loads(streamed)))
+
+    def test_separators(self):
+        o = {"a": [1, 2], "b": jxon.loads("<p>x</p>")}
+        self.assertEqual(jxon.dumps(o, separators=(',', ':')), '{"a":[1,2],"b":<p>x</p>}')
+        self.assertEqual(jxon.dumps(o), '{"a": [1, 2], "b": <p>x</p>}')
+        self.assertEqual(jxon.dumps(o, indent=1, separators=(',', ':')), '{\n "a":[\n  1,\n  2\n ],\n "b":<p>\n  x\n </p>\n}')
+
+    def test_jxsd(self):
+        with open("tests/test.jxsd", "r") as fh:
+            schema = jxsd.load(fh)
+
+        s = jxsd.dumps(schema, indent=2, sort_keys=True)
+        self.assertEqual("".join(jxsd.iterencode(schema, indent=2, sort_keys=True)), s)
+
+        fh = io.StringIO()
+        jxsd.dump(schema, fh, indent=2, sort_keys=True)
+        self.assertEqual(fh.getvalue(), s)
+
+
+class FingerprintTests(unittest.TestCase):
+
+    def test_equal(self):
+        self.assertFalse(jxon.jxon_equal([1, 2], [1, 2, 3]))
+        self.assertFalse(jxon.jxon_equal({"a": [1]}, {"a": [1], "b": [2]}))
+        self.assertFalse(jxon.jxon_equal(jxon.loads("<a><b/></a>"), jxon.loads("<a><b/><c/></a>")))
+        self.assertFalse(jxon.jxon_equal([1], [1.0]))
+        self.assertTrue(jxon.jxon_equal({"a": 1, "b": [None]}, {"b": [None], "a": 1}))
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint({"a": 1, "b": [1, 2]}), fingerprint({"b": [1, 2], "a": 1}))
+        self.assertEqual(fingerprint({"a": [1]}), fingerprint(jxon.loads('{"a": [1]}', records=True)))
+        self.assertEqual(fingerprint(jxon.loads('<a x="1" y="2">t<b/>u</a>')),
+                         fingerprint(jxon.loads('<a y="2" x="1">t<b/>u</a>')))
+
+        distinct = [[1, 2], [2, 1], [1.0, 2.0], ["12"], ["1", "2"], [[1, 2]], [True], [None], [],
+                    jxon.loads('[<a>t<b/>u</a>]'), jxon.loads('[<a>t<b/>v</a>]'), jxon.loads('[<a x="1"/>]')]
+        self.assertEqual(len({fingerprint(o) for o in distinct}), len(distinct))
+
+        for filename in ALL_TESTS:
+            loaded = []
+            for _ in range(2):
+                with open("tests/" + filename, "r") as fh:
+                    loaded.append(jxon.load(fh))
+            self.assertEqual(fingerprint(loaded[0]), fingerprint(loaded[1]))
+
+    def test_cache(self):
+        with open("tests/data.json", "r") as fh:
+            record = json.load(fh)
+        documents = [[json.loads(json.dumps(record)) for _ in range(10)]]
+        documents.append(list(documents[0]))
+        documents[1][3] = dict(documents[1][3], extra=True)
+
+        cache = FingerprintCache()
+        first = fingerprint(documents[0], cache)
+        misses = cache.misses
+        self.assertEqual(first, fingerprint(documents[0]))
+        self.assertNotEqual(first, fingerprint(documents[1], cache))
+        # only the new top-level list and the changed record were hashed afresh
+        self.assertEqual(cache.misses, misses + 2)
+        self.assertTrue(jxon.jxon_equal(documents[0], documents[0][:], cache=cache))
+        self.assertFalse(jxon.jxon_equal(documents[0], documents[1], cache=cache))
+
+        # a fingerprint gone stale by a change in place doesn't make values equal
+        copy = json.loads(json.dumps(record))
+        self.assertTrue(jxon.jxon_equal(documents[0][0], copy, cache=cache))
+        copy["user_id"] = "changed"
+        self.assertFalse(jxon.jxon_equal(documents[0][0], copy, cache=cache))
+
+        for o1, o2 in [([-0.0], [0.0]), ([float("nan")], [float("nan")]), ({"a": 1.5}, {"a": 1.5})]:
+            self.assertEqual(jxon.jxon_equal(o1, o2, cache=cache), jxon.jxon_equal(o1, o2))
+
+
+class SchemaTests(unittest.TestCase):
+
+    def test_parse_type(self):
+        t = parse_type([None, {"a": None, "b": [None, 1]}, {"a": "x", "b": []}])
+        self.assertEqual(jxsd.dumps(t), '[{"a": String, "b": [Integer]}]')
+
+        for obj, message in [
+            ([{"a": [1, 2, {"c": 1}]}], "at value[0]['a'][2]"),
+            ([{"a": None}, {"a": 1}, {"a": "x"}], "at value[2]['a']"),
+            ([{"a": 1}, {"b": 1}], "at value[1]"),
+        ]:
+            with self.assertRaises(JXONSchemaValidityException) as context:
+                parse_type(obj)
+            self.assertTrue(str(context.exception).endswith(message))
+
+        nested = 1
+        for _ in range(10 ** 4):
+            nested = [nested]
+        t = parse_type(nested)
+        for _ in range(10 ** 4):
+            t = t.subtype
+        self.assertIs(t.jxon_type, int)
+
+    def test_parse_type_bounded(self):
+        obj = [1] * 1000
+        obj[500] = "x"
+        with self.assertRaises(JXONSchemaValidityException):
+            parse_type(obj)
+        # evenly spaced samples miss the string
+        self.assertEqual(jxsd.dumps(parse_type(obj, sample=10)), "[Integer]")
+
+        obj = [[None, None, 1], {"a": 1}]
+        self.assertEqual(jxsd.dumps(parse_type(obj, max_elements=2)), "[[None]]")
+
+    def test_load_schema(self):
+        with open("tests/test.jxsd", "r") as fh:
+            schema = jxsd.load(fh)
+        with open("tests/test.jxon", "r") as fh:
+            self.assertEqual(jxon.load(fh, schema=schema)["age"], 23)
+
+        self.assertEqual(jxon.loads('{"name": null, "age": 1, "schools": [null], "intro": null}', schema=schema)["age"], 1)
+
+        for s, message, col in [
+            ('{"name": "a", "age": 1.5, "schools": [], "intro": <p/>}', "Expected Integer", 22),
+            ('{"name": "a", "age": 1, "schools": [{"name": "b", "type": "Tertiary"}], "intro": <p/>}',
+             "Expected one of 'Postsecondary', 'Primary', 'Secondary'", 59),
+            ('{"name": "a", "age": 1, "schools": [], "intro": <p/>, "x": 1}', "Unexpected key: 'x'", 55),
+            ('{"name": "a", "age": 1, "schools": []}', "Missing key: 'intro'", 38),
+            ('{"name": "a", "age": 1, "schools": {}, "intro": <p/>}', "Expected array", 36),
+            ('x = [1]\n\nexport default x;', "Default export does not match schema", 16),
+        ]:
+            with self.assertRaises(JXONParseException) as context:
+                jxon.loads(s, schema=schema)
+            self.assertTrue(str(context.exception).startswith("(line %d, col %d) %s\n" % (s.count("\n") + 1, col, message)))
+
+    def test_compile(self):
+        with open("tests/test.jxsd", "r") as fh:
+            schema = jxsd.load(fh)
+        with open("tests/test.jxon", "r") as fh:
+            o = jxon.load(fh)
+
+        validate = schema.compile()
+        self.assertTrue(validate(o))
+        self.assertTrue(validate(None))
+        for change in [{"age": 23.5}, {"age": True}, {"extra": 1}, {"intro": "text"},
+                       {"schools": [{"name": "Duke", "type": "University"}]},
+                       {"schools": [{"name": "Duke"}]}]:
+            changed = dict(o, **change)
+            self.assertEqual(validate(changed), schema.is_jxon_instance(changed))
+            self.assertFalse(validate(changed))
+
+        # null matches any type, both in the object and in the schema
+        self.assertTrue(validate(dict(o, name=None, schools=[None])))
+        self.assertTrue(JXONType(dict, {"a": None}).compile()({"a": [1]}))
+
+    def test_compile_json(self):
+        for test_file in TEST_JSON:
+            with open('tests/' + test_file, 'r') as fh:
+                o = json.load(fh)
+            self.assertTrue(parse_type(o).compile()(o))
+
+        nested = 1
+        for _ in range(50):
+            nested = [{"a": nested}]
+        validate = parse_type(nested).compile()
+        self.assertTrue(validate(nested))
+        self.assertFalse(validate([{"a": [{"a": 1}]}]))
+
+    def test_records(self):
+        # records are checked like the dicts they stand for
+        for test_file in TEST_JSON:
+            with open('tests/' + test_file, 'r') as fh:
+                o = jxon.load(fh, records=True)
+            schema = parse_type(o)
+            self.assertTrue(schema.is_jxon_instance(o))
+            self.assertTrue(schema.compile()(o))
+
+        v = jxon.loads('[{"a": 1}, {"a": 2}]', records=True)
+        schema = jxsd.loads('[{"a": Integer}]')
+        self.assertTrue(schema.is_jxon_instance(v) and schema.compile()(v))
+        schema = jxsd.loads('[{"a": String}]')
+        self.assertFalse(schema.is_jxon_instance(v) or schema.compile()(v))
+
+
+class RecordTests(unittest.TestCase):
+
+    def test_records(self):
+        with open("tests/data.json", "r") as fh:
+            record = json.load(fh)
+        s = json.dumps([record] * 3)
+        records = jxon.loads(s, records=True)
+
+        self.assertIsInstance(records[0], JXONRecord)
+        self.assertIs(type(records[0]), type(records[2]))
+        self.assertEqual(records[1]["personal_info"]["name"], record["personal_info"]["name"])
+        self.assertEqual(list(records[1]), list(record))
+        self.assertEqual(records, json.loads(s))
+        self.assertEqual(records[0].to_dict(), record)
+        self.assertIs(type(records[0].to_dict()["personal_info"]), dict)
+
+        self.assertTrue(jxon.jxon_equal(records, json.loads(s)))
+        for indent in [None, 2]:
+            self.assertEqual(jxon.dumps(records, indent=indent), jxon.dumps(json.loads(s), indent=indent))
+
+    def test_schema_records(self):
+        schema = jxsd.loads('[{"a": Integer, "b": [{"c": String}]}]')
+        records = jxon.loads('[{"b": [{"c": "x"}], "a": 1}, {"a": 2, "b": [], "d": 3}]', records=schema)
+        self.assertEqual(list(records[0].keys()), ["a", "b"])
+        self.assertIsInstance(records[0]["b"][0], JXONRecord)
+        # objects that don't have exactly the keys of the schema are left as dicts
+        self.assertIs(type(records[1]), dict)
+        with self.assertRaises(KeyError):
+            records[0]["d"]
+
+
+class BinaryTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        for filename in ALL_TESTS:
+            with open("tests/" + filename, "r") as fh:
+                obj = jxon.load(fh)
+            b = binary.dumps(obj)
+            self.assertTrue(jxon.jxon_equal(binary.loads(b), obj))
+            self.assertLess(len(b), len(jxon.dumps(obj)))
+
+        for obj in [None, -2**70, 0.5, "\u03bb", [], [None, [1]], [{"a": None}, {"a": [True]}]]:
+            self.assertEqual(binary.loads(binary.dumps(obj)), obj)
+
+        xml = jxon.loads('<a x="1">text<b/>tail</a>')
+        self.assertTrue(jxon.jxon_equal(binary.loads(binary.dumps([xml, None]))[0], xml))
+
+        s = '[{"a": 1, "b": {"c": [true]}}, {"a": null, "b": {"c": []}}]'
+        records = jxon.loads(s, records=True)
+        self.assertIsInstance(records[0], JXONRecord)
+        self.assertEqual(binary.loads(binary.dumps(records)), jxon.loads(s))
+
+    def test_schema(self):
+        schema = jxsd.loads('{"a": Enum("x", "y"), "b": [Integer]}')
+        b = binary.dumps({"a": "y", "b": [1, None]}, schema)
+        self.assertEqual(binary.loads(b), {"a": "y", "b": [1, None]})
+
+        with self.assertRaises(binary.JXONBinaryException):
+            binary.dumps({"a": "z", "b": []}, schema)
+        with self.assertRaises(binary.JXONBinaryException):
+            binary.loads(b[:-1])
+
+        schema = jxsd.loads('[{"a": Enum("x", "y", "z")}]')
+        obj = [{"a": "xyz"[i % 3]} for i in range(10)]
+        self.assertEqual(binary.loads(binary.dumps(obj, schema)), obj)
+
+    def test_deep_nesting(self):
+        obj = 1
+        for _ in range(10000):
+            obj = [obj]
+        decoded = binary.loads(binary.dumps(obj))
+        for _ in range(10000):
+            decoded = decoded[0]
+        self.assertEqual(decoded, 1)
+
+
+class LazyTests(unittest.TestCase):
+    DOC = 'x = 5\n' \
+          '{"a": {"b": [1, 2, {"c": x}]}, "j": {"k": [1,2]},\n' \
+          ' "xml": [<p>[ "not" a bracket</p>], /* ] */ "s": "]"}\n'
+
+    def test_lazy(self):
+        o = jxon.loads(self.DOC, lazy=True)
+        self.assertIsInstance(o, LazyDict)
+        self.assertIsInstance(o["a"]["b"], LazyList)
+        self.assertEqual(o["a"]["b"][2]["c"], 5)
+        self.assertEqual(o["xml"][0].text, '[ "not" a bracket')
+        self.assertEqual(o["j"], {"k": [1, 2]})
+        self.assertTrue(jxon.jxon_equal(o, jxon.loads(self.DOC)))
+        self.assertIs(type(o.materialize()["a"]["b"]), list)
+
+        # the plain JSON object is copied as it is, and the rest encoded as usual
+        self.assertIn('"j": {"k": [1,2]}', jxon.dumps(o))
+        self.assertEqual(jxon.dumps(o, indent=2), jxon.dumps(jxon.loads(self.DOC), indent=2))
+
+    def test_lazy_errors(self):
+        o = jxon.loads('{"a": 1,\n "b": [1, 2 3]}', lazy=True)
+        self.assertEqual(o["a"], 1)
+        with self.assertRaises(JXONParseException) as cm:
+            o["b"][0]
+        self.assertTrue(str(cm.exception).startswith("(line 2, col 13) Expected ']'"))
+
+        with self.assertRaises(JXONParseException):
+            jxon.loads('{"a": [1, [2]}', lazy=True)
+
+    def test_lazy_options(self):
+        s = '{"a": [1, 2], "b": {"c": "d"}}'
+        schema = parse_type(jxon.loads(s))
+        with self.assertRaises(ValueError):
+            jxon.loads(s, lazy=True, schema=schema)
+        with self.assertRaises(ValueError):
+            jxon.loads(s, lazy=True, records=True)
+        with open("tests/test.jxon", "r") as fh:
+            with self.assertRaises(ValueError):
+                jxon.load(fh, lazy=True, records=True)
+
+        o = jxon.loads(s, lazy=True, records=False)
+        self.assertTrue(schema.is_jxon_instance(o.materialize()))
+
+
+class LazyXMLTests(unittest.TestCase):
+    DOC = '{"intro": <div class="a">\n  <p>One <b>two</b></p>\n  <!-- kept -->\n</div>, "n": [<br/>]}'
+
+    def test_imports(self):
+        # XML in imported files is left unbuilt too, and their strings interned
+        with tempfile.TemporaryDirectory() as tempdir:
+            with open(os.path.join(tempdir, "b.jxon"), "w") as fh:
+                fh.write('[<q>b</q>, "shared"]')
+            path = os.path.join(tempdir, "a.jxon")
+            with open(path, "w") as fh:
+                fh.write('import b from "./b.jxon";\n\n{"b": b, "c": import("./b.jxon"), "s": "shared"}')
+
+            with open(path, "r") as fh:
+                o = jxon.load(fh, lazy_xml=True, intern=Interner(max_string_length=8))
+            self.assertIsInstance(o["b"][0], LazyElement)
+            self.assertIsInstance(o["c"][0], LazyElement)
+            self.assertEqual(o["c"][0].text, "b")
+            self.assertIs(o["b"][1], o["s"])
+
+    def test_verbatim(self):
+        o = jxon.loads(self.DOC, lazy_xml=True)
+        self.assertIsInstance(o["intro"], LazyElement)
+        self.assertEqual(jxon.dumps(o), self.DOC)
+        self.assertTrue(jxon.jxon_equal(jxon.loads(jxon.dumps(o, indent=2)), jxon.loads(self.DOC)))
+
+        # once looked into, elements are encoded as usual, changes and all
+        self.assertEqual(o["intro"][0][0].text, "two")
+        o["n"][0].text = "x"
+        self.assertEqual(jxon.dumps(o), jxon.dumps(jxon.loads(self.DOC)).replace("<br/>", "<br>x</br>"))
+
+    def test_lazy_xml_errors(self):
+        with self.assertRaises(JXONParseException) as cm:
+            jxon.loads('[<a>\n  <b></a>]', lazy_xml=True)
+        self.assertTrue(str(cm.exception).startswith("(line 2, col 8) Invalid XML: mismatched tag"))
+
+        o = jxon.loads('{"a": <b>hi</b>, "c": [1, <d>, x</d>]}', lazy=True, lazy_xml=True)
+        self.assertTrue(jxon.jxon_equal(o, jxon.loads('{"a": <b>hi</b>, "c": [1, <d>, x</d>]}')))
+
+        # the schema of a document of lazy elements is the same as usual, and it
+        # holds for them
+        schema = parse_type(jxon.loads('[<a/>, <b>x</b>]', lazy_xml=True))
+        self.assertEqual(schema.subtype.jxon_type.__name__, "Element")
+        self.assertIsInstance(jxon.loads('[<c/>]', schema=schema, lazy_xml=True)[0], LazyElement)
+
+
+class InternTests(unittest.TestCase):
+    DOC = '[\n// records\n{"name": "a", "status": "active"}, {"name": "b", "status": "active"},\n' \
+          ' {"name": "c", "status": "a rather long status"}, {"name": "d", "status": "a rather long status"}]'
+
+    def test_intern_keys(self):
+        records = jxon.loads(self.DOC, intern=True)
+        self.assertEqual(records, jxon.loads(self.DOC))
+        self.assertIs(list(records[0])[1], list(records[3])[1])
+        self.assertIsNot(records[0]["status"], records[1]["status"])
+
+        xml = jxon.loads('[<a x="1"/>, <a x="2"/>]', intern=True)
+        self.assertIs(xml[0].tag, xml[1].tag)
+        self.assertIs(list(xml[0].attrib)[0], list(xml[1].attrib)[0])
+
+    def test_intern_values(self):
+        # the JSON fast path interns values too, except for array elements
+        for doc in [self.DOC, self.DOC.replace("// records", "")]:
+            records = jxon.loads(doc, intern=Interner(max_string_length=8))
+            self.assertIs(records[0]["status"], records[1]["status"])
+            self.assertIsNot(records[2]["status"], records[3]["status"])
+
+        interner = Interner(maxsize=2)
+        records = jxon.loads(self.DOC, intern=interner)
+        self.assertEqual(len(interner), 2)
+        self.assertEqual([r["name"] for r in records], ["a", "b", "c", "d"])
+
+
+class ColumnarTests(unittest.TestCase):
+    ROWS = '{"rows": [{"a": 1, "b": 2.5, "c": true, "d": "x", "e": null}, ' \
+           '{"a": null, "b": 3.0, "c": false, "d": null, "e": 5}, ' \
+           '{"a": 99999999999999999999999, "b": null, "c": null, "d": "z", "e": 7}]}'
+
+    def test_columns(self):
+        columns = jxon.load_columnar(io.StringIO(self.ROWS), "rows", chunk_size=16)
+        self.assertEqual(list(columns), ["a", "b", "c", "d", "e"])
+        self.assertEqual(list(columns["a"]), [1, None, 99999999999999999999999])
+        self.assertEqual(columns["b"].values, array("d", [2.5, 3.0, 0.0]))
+        self.assertEqual(list(columns["b"].valid), [1, 1, 0])
+        self.assertEqual(list(columns["c"]), [True, False, None])
+        self.assertEqual(columns["d"].values, ["x", None, "z"])
+        self.assertEqual(columns["e"].values, array("q", [0, 5, 7]))
+        self.assertEqual(columns["e"].null_count(), 1)
+
+        with self.assertRaises(JXONSchemaValidityException):
+            jxon.load_columnar(io.StringIO('[{"a": 1}, {"a": 1.5}]'))
+
+        for s in ['[{"a": 1}, {"b": 2}]', '[{"a": 1}, {"a": 2, "b": 2}]', '[{"a": 1, "b": 2}, {"a": 2}]']:
+            with self.assertRaises(JXONSchemaValidityException) as cm:
+                jxon.load_columnar(io.StringIO(s))
+            self.assertTrue(str(cm.exception).startswith("Object 1 has keys"))
+
+    def test_schema(self):
+        schema = jxsd.loads('{"a": Integer, "b": Float}')
+        columns = jxon.load_columnar(io.StringIO('[{"a": null, "b": null}, {"a": 2, "b": 1.5}]'), schema=schema)
+        self.assertEqual(columns["a"].values, array("q", [0, 2]))
+        self.assertEqual(list(columns["b"]), [None, 1.5])
+
+        with self.assertRaises(JXONSchemaValidityException):
+            jxon.load_columnar(io.StringIO('[{"a": 1, "b": 1}]'), schema=schema)
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "requires NumPy")
+    def test_numpy(self):
+        columns = jxon.load_columnar(io.StringIO(self.ROWS), "rows", numpy=True)
+        self.assertEqual(columns["e"].values.sum(), 12)
+        self.assertEqual(columns["c"].values.dtype.name, "bool")
+
+
+class ModuleCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.files = {
+            "a.jxon": 'import b from "./b.jxon";\nimport c from "./c.jxon";\n\n{"b": b, "c": c}',
+            "b.jxon": 'import d from "./d.json";\n\n{"d": d}',
+            "c.jxon": 'import d from "./d.json";\n\n[d, import("./d.json")]',
+            "d.json": '{"x": [1, 2]}',
+        }
+        for name, content in self.files.items():
+            self.write(name, content)
+        module_cache.clear()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        module_cache.clear()
+
+    def path(self, name):
+        return os.path.join(self.tempdir.name, name)
+
+    def write(self, name, content):
+        with open(self.path(name), "w") as fh:
+            fh.write(content)
+
+    def load(self, name, workers=None):
+        with open(self.path(name), "r") as fh:
+            return jxon.load(fh, workers=workers)
+
+    def test_diamond(self):
+        o = self.load("a.jxon")
+        self.assertEqual(o, {"b": {"d": {"x": [1, 2]}}, "c": [{"x": [1, 2]}, {"x": [1, 2]}]})
+        self.assertEqual(module_cache.misses, 3)
+        self.assertEqual(module_cache.hits, 2)
+
+        self.load("a.jxon")
+        self.assertEqual(module_cache.misses, 3)
+
+    def test_copies(self):
+        o = self.load("c.jxon")
+        o[0]["x"].append(3)
+        self.assertEqual(o[1], {"x": [1, 2]})
+        self.assertEqual(self.load("c.jxon"), [{"x": [1, 2]}, {"x": [1, 2]}])
+
+    def test_invalidation(self):
+        self.load("a.jxon")
+        self.write("d.json", '{"x": [1, 2, 3]}')
+        # b.jxon and c.jxon are unchanged, but must be reparsed because d.json changed
+        self.assertEqual(self.load("a.jxon")["b"], {"d": {"x": [1, 2, 3]}})
+        self.assertEqual(module_cache.misses, 6)
+
+    def test_eviction(self):
+        cache = ModuleCache(maxsize=1)
+        cache.load(self.path("d.json"), CombinedParser)
+        cache.load(self.path("b.jxon"), CombinedParser)
+        self.assertEqual(len(cache), 1)
+        cache.load(self.path("d.json"), CombinedParser)
+        self.assertEqual(cache.misses, 3)
+
+    def test_workers(self):
+        o = self.load("a.jxon")
+        module_cache.clear()
+        self.assertEqual(self.load("a.jxon", workers=2), o)
+        self.assertEqual(module_cache.hits, 2)
+
+        # errors, including import cycles, are reported exactly as without workers
+        for name, content, message in [
+            ("c.jxon", 'import a from "./a.jxon";\n\na', "Import cycle: "),
+            ("d.json", '{"x": [1, 2,]}', "Unknown expression type"),
+        ]:
+            self.write(name, content)
+            messages = []
+            for workers in [None, 2]:
+                module_cache.clear()
+                with self.assertRaises(JXONParseException) as context:
+                    self.load("a.jxon", workers=workers)
+                messages.append(str(context.exception))
+            self.assertIn(message, messages[0])
+            self.assertEqual(messages[0], messages[1])
+
+    def use_disk_cache(self, readonly=False):
+        cache_dir = self.path("__jxoncache__")
+        self.addCleanup(setattr, disk_cache, "directory", disk_cache.directory)
+        self.addCleanup(setattr, disk_cache, "readonly", disk_cache.readonly)
+        disk_cache.directory = cache_dir
+        disk_cache.readonly = readonly
+        disk_cache.clear()
+        return cache_dir
+
+    def test_disk_cache(self):
+        cache_dir = self.use_disk_cache()
+        o = self.load("a.jxon")
+        self.assertEqual(len(os.listdir(cache_dir)), 4)
+        self.assertEqual(disk_cache.misses, 4)
+
+        module_cache.clear()
+        self.assertEqual(self.load("a.jxon"), o)
+        self.assertEqual(disk_cache.hits, 1)
+
+        module_cache.clear()
+        self.write("d.json", '{"x": []}')
+        self.assertEqual(self.load("a.jxon")["c"], [{"x": []}, {"x": []}])
+        self.assertEqual(disk_cache.misses, 8)
+
+    def test_disk_cache_readonly(self):
+        cache_dir = self.use_disk_cache(readonly=True)
+        self.load("a.jxon")
+        self.assertFalse(os.path.exists(cache_dir))
+
+
+class StoreLoader(AsyncLoader):
+    def __init__(self, files):
+        self.files = files
+        self.reading = 0
+        self.max_reading = 0
+
+    async def read(self, filepath):
+        self.reading += 1
+        self.max_reading = max(self.max_reading, self.reading)
+        await asyncio.sleep(0.01)
+        self.reading -= 1
+        if filepath not in self.files:
+            raise FileNotFoundError(filepath)
+        return self.files[filepath]
+
+
+class StatsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.files = {
+            "a.jxon": 'import b from "./b.jxon";\nimport {d} from "./d.jxon";\n\n'
+                      'x = [d, <p>é<br/></p>]\n\n{"b": b, "x": x}',
+            "b.jxon": 'import {d} from "./d.jxon";\n\n[d, "s", null]',
+            "d.jxon": 'd = {"n": 1.5, "t": true}\n\nexport d;',
+        }
+        for name, content in self.files.items():
+            with open(os.path.join(self.tempdir.name, name), "w") as fh:
+                fh.write(content)
+        module_cache.clear()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        module_cache.clear()
+
+    def tree(self, span):
+        # the names, files and cached flags of span and those inside it
+        path = span.path and os.path.basename(span.path)
+        return (span.name, path, span.cached, [self.tree(child) for child in span.children])
+
+    def test_spans(self):
+        started, ended = [], []
+        stats = ParseStats(on_start=started.append, on_end=ended.append)
+        with open(os.path.join(self.tempdir.name, "a.jxon"), "r") as fh:
+            o = jxon.load(fh, stats=stats)
+        d = '{"n": 1.5, "t": true}'
+        self.assertTrue(jxon.jxon_equal(o, jxon.loads('{"b": [%s, "s", null], "x": [%s, <p>é<br/></p>]}' % (d, d))))
+
+        def phases(imports=()):
+            return [("imports", None, False, list(imports)), ("variables", None, False, []),
+                    ("default export", None, False, []), ("exports", None, False, [])]
+
+        self.assertEqual(self.tree(stats.spans[0]), ("file", "a.jxon", False, phases([
+            ("file", "b.jxon", False, phases([("file", "d.jxon", False, phases())])),
+            ("file", "d.jxon", True, []),
+        ])))
+        self.assertEqual({id(span) for span in started}, {id(span) for span in ended})
+        self.assertIs(ended[-1], stats.spans[0])
+
+        report = stats.report()
+        self.assertEqual(report["bytes"], sum(len(content.encode()) for content in self.files.values()))
+        self.assertEqual(report["spans"][0]["bytes"], len(self.files["a.jxon"].encode()))
+        self.assertEqual(report["nodes"], {"objects": 3, "arrays": 2, "strings": 1, "numbers": 2, "booleans": 2,
+                                           "nulls": 1, "xml_elements": 2, "lazy": 0})
+
+    def test_errors(self):
+        stats = ParseStats()
+        jxon.loads('[1, 2]', stats=stats, lazy=True)
+        self.assertEqual(stats.report()["nodes"]["lazy"], 1)
+
+        with self.assertRaises(JXONParseException):
+            jxon.loads('x = 1\n[x, ]', stats=stats)
+        self.assertEqual(stats.stack, [])
+        self.assertEqual([span.name for span in stats.spans[1].children], ["imports", "variables", "default export"])
+        self.assertIsNotNone(stats.spans[1].children[-1].end_time)
+
+
+class AsyncTests(unittest.TestCase):
+
+    def test_aload(self):
+        o = asyncio.run(jxon.aload("tests/test.jxon"))
+        with open("tests/test.jxon", "r") as fh:
+            self.assertTrue(jxon.jxon_equal(o, jxon.load(fh)))
+
+        self.assertEqual(asyncio.run(jxon.aloads('[1, "a"]')), [1, "a"])
+
+    def test_loader(self):
+        loader = StoreLoader({
+            "/store/a.jxon": 'import b from "./b.jxon";\nimport c from "./c.jxon";\n\n[b, c]',
+            "/store/b.jxon": 'import c from "./c.jxon";\n\n{"c": c}',
+            "/store/c.json": '[1, 2]',
+            "/store/c.jxon": 'import c from "./c.json";\n\n[c]',
+        })
+        self.assertEqual(asyncio.run(jxon.aload("/store/a.jxon", loader=loader)), [{"c": [[1, 2]]}, [[1, 2]]])
+        # b.jxon and c.jxon are fetched concurrently
+        self.assertEqual(loader.max_reading, 2)
+
+        loader.files["/store/c.json"] = '[1, 2'
+        with self.assertRaises(JXONParseException):
+            asyncio.run(jxon.aload("/store/a.jxon", loader=loader))
+
+    def test_inline_imports(self):
+        # inline imports are fetched through the loader too, never from the filesystem
+        store = os.path.abspath("tests")
+        loader = StoreLoader({
+            store + "/a.jxon": '{"c": import("./c.json"), "d": [import("./d.jxon")]}',
+            store + "/c.json": '[1, 2]',
+            store + "/d.jxon": '[import("./c.json")]',
+            store + "/e.jxon": '[import("./data.json")]',
+        })
+        o = asyncio.run(jxon.aload(store + "/a.jxon", loader=loader, records=True))
+        self.assertIsInstance(o, JXONRecord)
+        self.assertEqual(o, {"c": [1, 2], "d": [[[1, 2]]]})
+
+        with self.assertRaises(JXONParseException) as cm:
+            asyncio.run(jxon.aload(store + "/e.jxon", loader=loader))
+        self.assertEqual(str(cm.exception), "Not fetched through the loader: " + store + "/data.json")
+
+        self.assertIsInstance(asyncio.run(jxon.aloads('{"a": [1]}', lazy=True)), LazyDict)
+
+    def test_adump(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            filepath = os.path.join(tempdir, "out.jxon")
+            asyncio.run(jxon.adump({"a": [1, 2]}, filepath, indent=2))
+            with open(filepath, "r") as fh:
+                self.assertEqual(fh.read(), jxon.dumps({"a": [1, 2]}, indent=2))
+
+
+class StreamingTests(unittest.TestCase):
+
+    def test_events(self):
+        s = '{"a": [1, 2], // comment\n "b": <p>hi</p>, "c": {}}'
+        events = [(event, path, value) for event, path, value in jxon.iterparse(io.StringIO(s), chunk_size=2)
+                  if event != "value" or path != ("b",)]
+        self.assertEqual(events, [
+            ("start_map", (), None),
+            ("map_key", (), "a"),
+            ("start_array", ("a",), None),
+            ("value", ("a", 0), 1),
+            ("value", ("a", 1), 2),
+            ("end_array", ("a",), None),
+            ("map_key", (), "b"),
+            ("map_key", (), "c"),
+            ("start_map", ("c",), None),
+            ("end_map", ("c",), None),
+            ("end_map", (), None),
+        ])
+
+    def test_iter_items(self):
+        with open("tests/random.json", "r") as fh:
+            records = json.load(fh)
+
+        with open("tests/random.json", "r") as fh:
+            self.assertEqual(list(jxon.iter_items(fh, "", chunk_size=100)), records)
+
+        with open("tests/random.json", "r") as fh:
+            tags = [tag for record in records for tag in record["tags"]]
+            self.assertEqual(list(jxon.iter_items(fh, "item.tags", chunk_size=7)), tags)
+
+    def test_default_export_variable(self):
+        with open("tests/test.jxon", "r") as fh:
+            events = list(jxon.iterparse(fh))
+        with open("tests/test.jxon", "r") as fh:
+            self.assertTrue(jxon.jxon_equal(events[0][2], jxon.load(fh)))
+
+    def test_xml_across_chunks(self):
+        # attribute values and comments cut off by the end of the window are read on
+        s = "[" + ", ".join('<a t="%s"><!-- %s -->x</a>' % ("y" * i, "z" * i) for i in range(0, 300, 7)) + "]"
+        for chunk_size in (1, 16, 1024):
+            items = list(jxon.iter_items(io.StringIO(s), "", chunk_size=chunk_size))
+            self.assertTrue(jxon.jxon_equal(items, jxon.loads(s)))
+
+        with open("tests/artelevanto.xml", "r") as fh:
+            events = list(jxon.iterparse(fh, chunk_size=64))
+        with open("tests/artelevanto.xml", "r") as fh:
+            self.assertTrue(jxon.jxon_equal(events[0][2], jxon.load(fh)))
+
+        with self.assertRaises(JXONParseException) as cm:
+            list(jxon.iterparse(io.StringIO('[1,\n <a t="x>' + " " * 200 + "]"), chunk_size=16))
+        self.assertTrue(str(cm.exception).startswith("(line 2, col 2) Invalid XML: unclosed token"))
+
+    def test_bounded_window(self):
+        with open("tests/random.json", "r") as fh:
+            s = "[" + ", ".join([fh.read()] * 50) + "]"
+
+        parser = CombinedParser("")
+        window = 0
+        for _ in parser.iter_events(io.StringIO(s), chunk_size=1024):
+            window = max(window, len(parser.text))
+        self.assertLess(window, 4096)
+
+    def test_inconsistent_schema(self):
+        with self.assertRaises(JXONParseException) as cm:
+            list(jxon.iterparse(io.StringIO('[\n  {"a": 1},\n  {"b": 1}\n]'), chunk_size=4))
+        self.assertTrue(str(cm.exception).startswith("(line 3, col 11) Inconsistent list element type"))
+
+
+class IndexedTests(unittest.TestCase):
+
+    def test_indexed_array(self):
+        with open("tests/data.json", "r") as fh:
+            record = json.load(fh)
+        records = [dict(record, id=i, name="\u00fc" * i) for i in range(200)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "records.json")
+            with open(path, "w", encoding="utf-8") as fh:
+                json.dump(records, fh, ensure_ascii=False, indent=2)
+
+            for _ in range(2):
+                # the second time round, the index is read from its sidecar file
+                with jxon.open_indexed(path, chunk_size=256) as doc:
+                    self.assertEqual(len(doc), 200)
+                    self.assertEqual(doc[123], records[123])
+                    self.assertEqual(doc[-1], records[-1])
+                    self.assertEqual(doc[5:8], records[5:8])
+                    with self.assertRaises(IndexError):
+                        doc[200]
+                self.assertTrue(os.path.exists(path + ".index"))
+
+    def test_indexed_object(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "doc.jxon")
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write('x = "\u03bb"\n{"a": [x], // comment\n "b": <p>[not "a" bracket]</p>, "c": null}\n')
+
+            with jxon.open_indexed(path, sidecar=False) as doc:
+                self.assertEqual(doc.keys(), ["a", "b", "c"])
+                self.assertEqual(doc["a"], ["\u03bb"])
+                self.assertEqual(doc["b"].text, '[not "a" bracket]')
+                self.assertIsNone(doc["c"])
+                self.assertNotIn("d", doc)
+            self.assertFalse(os.path.exists(path + ".index"))
+
+            with open(path, "w") as fh:
+                fh.write('{"a": 1, "a": 2}')
+            with self.assertRaises(JXONParseException):
+                jxon.open_indexed(path)
+
+
+class LargeDocumentTests(unittest.TestCase):
+    # Each document holds a variable or a comment, so that it is read by the
+    # parser itself rather than handed to the json module
+    LENGTH = 10**6
+    DEPTH = 10**4
+
+    def test_long_array(self):
+        o = jxon.loads("x = -1\n[" + ", ".join(str(i) for i in range(self.LENGTH)) + ", x]")
+        self.assertEqual(len(o), self.LENGTH + 1)
+        self.assertEqual(o[-2:], [self.LENGTH - 1, -1])
+
+    def test_long_object(self):
+        o = jxon.loads("{" + ", ".join('"k%d": %d' % (i, i) for i in range(self.LENGTH)) + " // end\n}")
+        self.assertEqual(len(o), self.LENGTH)
+        self.assertEqual(o["k12345"], 12345)
+
+    def test_deep_nesting(self):
+        o = jxon.loads("[" * self.DEPTH + "/* innermost */" + "]" * self.DEPTH)
+        depth = 1
+        while o != []:
+            o = o[0]
+            depth += 1
+        self.assertEqual(depth, self.DEPTH)
+
+        o = jxon.loads('x = null\n' + '{"a": ' * self.DEPTH + 'x' + '}' * self.DEPTH)
+        depth = 0
+        while o is not None:
+            o = o["a"]
+            depth += 1
+        self.assertEqual(depth, self.DEPTH)
+
+        o = jxon.loads("<a>" * self.DEPTH + "</a>" * self.DEPTH)
+        depth = 1
+        while len(o) > 0:
+            o = o[0]
+            depth += 1
+        self.assertEqual(depth, self.DEPTH)
+
+    def test_long_whitespace(self):
+        s = "// comment\n\n/* comment */\n" * self.DEPTH
+        self.assertEqual(jxon.loads(s + "[" + s + "1" + s + "]" + s), [1])
+
+
 if __name__ == "__main__":
     unittest.main()